@@ -148,11 +148,31 @@ INSERT INTO order_items (order_id, product_id, quantity, unit_price, total_price
 -- Update some product stock quantities to reflect sales
 UPDATE products SET last_updated = CURRENT_TIMESTAMP;
 
+-- Backfill last_sold_at (the trigger maintains it for new order items)
+UPDATE products p
+SET last_sold_at = s.last_sold_at
+FROM (
+    SELECT oi.product_id, MAX(o.order_date)::date as last_sold_at
+    FROM order_items oi
+    JOIN orders o ON oi.order_id = o.order_id
+    GROUP BY oi.product_id
+) s
+WHERE p.product_id = s.product_id;
+
 -- Add some customer preferences
 UPDATE customers SET preferences = '{"newsletter": true, "categories": ["Electronics", "Books"]}' WHERE customer_id = 1;
 UPDATE customers SET preferences = '{"newsletter": false, "categories": ["Clothing", "Beauty"]}' WHERE customer_id = 2;
 UPDATE customers SET preferences = '{"newsletter": true, "categories": ["Books", "Sports"]}' WHERE customer_id = 3;
 
+-- Populate materialized views now that the base tables have data
+SELECT refresh_materialized_view('customer_order_summary');
+SELECT refresh_materialized_view('dashboard_metrics_daily');
+SELECT refresh_materialized_view('dashboard_product_revenue_daily');
+SELECT refresh_materialized_view('dashboard_city_revenue_daily');
+
+-- Set visibility map and planner statistics so index-only scans skip the heap
+VACUUM (ANALYZE) orders;
+
 -- Print completion message
 SELECT 'Sample data inserted successfully!' as status,
        (SELECT COUNT(*) FROM customers) as customers_count,
@@ -10,6 +10,7 @@ DROP TABLE IF EXISTS orders CASCADE;
 DROP TABLE IF EXISTS products CASCADE;
 DROP TABLE IF EXISTS categories CASCADE;
 DROP TABLE IF EXISTS customers CASCADE;
+DROP TABLE IF EXISTS materialized_view_refreshes CASCADE;
 
 -- Customers table
 CREATE TABLE customers (
@@ -42,7 +43,11 @@ CREATE TABLE products (
     description TEXT,
     average_rating DECIMAL(3,2) CHECK (average_rating >= 0 AND average_rating <= 5),
     created_date DATE DEFAULT CURRENT_DATE,
-    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_sold_at DATE,
+    search_tsv TSVECTOR GENERATED ALWAYS AS (
+        to_tsvector('english', product_name || ' ' || COALESCE(description, ''))
+    ) STORED
 );
 
 -- Orders table
@@ -68,15 +73,29 @@ CREATE TABLE order_items (
 );
 
 -- Create indexes for better query performance
-CREATE INDEX idx_customers_email ON customers(email);
+-- customers.email needs no extra index: its UNIQUE constraint already creates one
 CREATE INDEX idx_customers_city ON customers(city);
-CREATE INDEX idx_products_category ON products(category_id);
-CREATE INDEX idx_products_price ON products(price);
-CREATE INDEX idx_orders_customer ON orders(customer_id);
-CREATE INDEX idx_orders_date ON orders(order_date);
-CREATE INDEX idx_orders_status ON orders(status);
-CREATE INDEX idx_order_items_order ON order_items(order_id);
-CREATE INDEX idx_order_items_product ON order_items(product_id);
+-- Also serves category_id lookups; lets per-category top-rated scans stop after LIMIT rows
+CREATE INDEX idx_products_category_rating ON products(category_id, average_rating DESC NULLS LAST);
+-- Keyset pagination for product search: sort key + product_id tiebreak
+CREATE INDEX idx_products_category_price ON products(category_id, price, product_id) INCLUDE (product_name, average_rating);
+-- Also covers lookups and range scans on price alone
+CREATE INDEX idx_products_price_id ON products(price, product_id);
+CREATE INDEX idx_products_rating_id ON products((COALESCE(average_rating, 0)), product_id);
+-- Full-text product search
+CREATE INDEX idx_products_search_gin ON products USING GIN (search_tsv);
+-- Slow-moving inventory checks only ever look at products with stock on hand
+CREATE INDEX idx_products_last_sold ON products(last_sold_at) WHERE stock_quantity > 0;
+-- Two-column keys let retention/customer queries run as index-only scans in
+-- either access order; they also cover lookups by customer_id or order_date alone
+CREATE INDEX idx_orders_cust_date ON orders(customer_id, order_date);
+CREATE INDEX idx_orders_date_cust ON orders(order_date, customer_id);
+-- Also covers status-only filters
+CREATE INDEX idx_orders_status_date ON orders(status, order_date);
+-- (order_id, product_id) lets co-purchase lookups read product ids straight from the
+-- index; the INCLUDE columns make order detail/item fetches index-only scans too
+CREATE INDEX idx_order_items_order_product ON order_items(order_id, product_id) INCLUDE (quantity, unit_price, total_price);
+CREATE INDEX idx_order_items_product_order ON order_items(product_id, order_id);
 
 -- Create a function to update product stock
 CREATE OR REPLACE FUNCTION update_product_stock()
@@ -103,25 +122,160 @@ CREATE TRIGGER trg_update_stock
     FOR EACH ROW
     EXECUTE FUNCTION update_product_stock();
 
+-- Keep products.last_sold_at in step with the latest order containing the product
+CREATE OR REPLACE FUNCTION update_product_last_sold()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE products
+        SET last_sold_at = GREATEST(products.last_sold_at, o.order_date::date)
+        FROM orders o
+        WHERE o.order_id = NEW.order_id
+          AND products.product_id = NEW.product_id;
+        RETURN NEW;
+    ELSIF TG_OP = 'DELETE' THEN
+        -- A removed line (e.g. a cancelled order) may have been the latest sale,
+        -- so recompute from the product's remaining lines via idx_order_items_product_order
+        UPDATE products
+        SET last_sold_at = (
+            SELECT MAX(o.order_date)::date
+            FROM order_items oi
+            JOIN orders o ON oi.order_id = o.order_id
+            WHERE oi.product_id = OLD.product_id
+        )
+        WHERE product_id = OLD.product_id;
+        RETURN OLD;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_update_last_sold
+    AFTER INSERT OR DELETE ON order_items
+    FOR EACH ROW
+    EXECUTE FUNCTION update_product_last_sold();
+
+-- Tell listening application caches which table changed (CachedDatabase in
+-- src/cache.py). Statement-level, so a bulk write sends one notification, and
+-- Postgres folds identical notifications within a transaction.
+CREATE OR REPLACE FUNCTION notify_table_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('table_changed', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_customers_changed
+    AFTER INSERT OR UPDATE OR DELETE ON customers
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_table_changed();
+
+CREATE TRIGGER trg_products_changed
+    AFTER INSERT OR UPDATE OR DELETE ON products
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_table_changed();
+
+CREATE TRIGGER trg_orders_changed
+    AFTER INSERT OR UPDATE OR DELETE ON orders
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_table_changed();
+
+CREATE TRIGGER trg_order_items_changed
+    AFTER INSERT OR UPDATE OR DELETE ON order_items
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_table_changed();
+
 -- Add some constraints and business rules
 ALTER TABLE order_items 
 ADD CONSTRAINT chk_total_price 
 CHECK (total_price = quantity * unit_price);
 
+-- Customer lifetime value from one customer's order aggregates. The single
+-- definition of the formula: customer_order_summary and the live per-customer
+-- lookup in the API both call it, so their numbers can't drift apart.
+CREATE OR REPLACE FUNCTION customer_clv(
+    total_spent NUMERIC,
+    total_orders BIGINT,
+    first_order_date TIMESTAMP,
+    last_order_date TIMESTAMP,
+    OUT avg_order_value NUMERIC,
+    OUT order_frequency_per_year NUMERIC,
+    OUT predicted_clv NUMERIC
+) AS $$
+    SELECT
+        freq.avg_order_value,
+        freq.order_frequency_per_year,
+        -- Simple CLV prediction: avg_order_value * predicted_orders_per_year * 2 years
+        freq.avg_order_value * freq.order_frequency_per_year * 2
+    FROM (
+        SELECT
+            COALESCE(total_spent / NULLIF(total_orders, 0), 0) as avg_order_value,
+            CASE
+                WHEN total_orders = 0 THEN 0
+                ELSE total_orders / GREATEST(EXTRACT(DAYS FROM (last_order_date - first_order_date)) / 365.0, 0.1)
+            END as order_frequency_per_year
+    ) freq
+$$ LANGUAGE sql IMMUTABLE;
+
 -- Create views for common queries
-CREATE VIEW customer_order_summary AS
-SELECT 
-    c.customer_id,
-    c.customer_name,
-    c.email,
-    c.city,
-    COUNT(DISTINCT o.order_id) as total_orders,
-    COALESCE(SUM(o.total_amount), 0) as total_spent,
-    MAX(o.order_date) as last_order_date,
-    MIN(o.order_date) as first_order_date
-FROM customers c
-LEFT JOIN orders o ON c.customer_id = o.customer_id
-GROUP BY c.customer_id, c.customer_name, c.email, c.city;
+-- customer_order_summary is materialized because every customer report reads
+-- it. It is refreshed on a schedule, off the request path: run
+-- scripts/refresh_views.py from cron (or with --every SECONDS), or use pg_cron:
+--   SELECT cron.schedule('refresh-customer-summary', '*/15 * * * *',
+--       $$SELECT refresh_materialized_view('customer_order_summary')$$);
+-- Paths that must reflect a write immediately (user profiles, a single
+-- customer's CLV) aggregate orders live instead.
+--
+-- The CLV inputs depend only on each customer's aggregates, so they are derived
+-- once per refresh; get_customer_lifetime_value then just reads and ranks them.
+CREATE MATERIALIZED VIEW customer_order_summary AS
+SELECT
+    totals.*,
+    clv.avg_order_value,
+    clv.order_frequency_per_year,
+    clv.predicted_clv
+FROM (
+    SELECT 
+        c.customer_id,
+        c.customer_name,
+        c.email,
+        c.city,
+        COUNT(DISTINCT o.order_id) as total_orders,
+        COALESCE(SUM(o.total_amount), 0) as total_spent,
+        MAX(o.order_date) as last_order_date,
+        MIN(o.order_date) as first_order_date,
+        COUNT(DISTINCT o.order_id) FILTER (WHERE o.order_date >= CURRENT_DATE - INTERVAL '6 months') as orders_last_6_months
+    FROM customers c
+    LEFT JOIN orders o ON c.customer_id = o.customer_id
+    GROUP BY c.customer_id, c.customer_name, c.email, c.city
+) totals
+CROSS JOIN LATERAL customer_clv(
+    totals.total_spent, totals.total_orders, totals.first_order_date, totals.last_order_date
+) clv;
+
+CREATE UNIQUE INDEX idx_customer_order_summary_id ON customer_order_summary(customer_id);
+CREATE INDEX idx_customer_order_summary_spent ON customer_order_summary(total_spent DESC);
+CREATE INDEX idx_customer_order_summary_last_order ON customer_order_summary(last_order_date);
+CREATE INDEX idx_customer_order_summary_clv ON customer_order_summary(predicted_clv DESC);
+
+-- Last refresh per materialized view, so readers can report how stale they are
+CREATE TABLE materialized_view_refreshes (
+    view_name TEXT PRIMARY KEY,
+    refreshed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO materialized_view_refreshes (view_name) VALUES ('customer_order_summary');
+
+CREATE OR REPLACE FUNCTION refresh_materialized_view(target_view TEXT)
+RETURNS VOID AS $$
+BEGIN
+    EXECUTE format('REFRESH MATERIALIZED VIEW CONCURRENTLY %I', target_view);
+
+    INSERT INTO materialized_view_refreshes (view_name, refreshed_at)
+    VALUES (target_view, clock_timestamp())
+    ON CONFLICT (view_name) DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at;
+
+    -- Application caches LISTEN here (see notify_table_changed below)
+    PERFORM pg_notify('table_changed', target_view);
+END;
+$$ LANGUAGE plpgsql;
 
 CREATE VIEW product_sales_summary AS
 SELECT 
@@ -138,5 +292,48 @@ JOIN categories c ON p.category_id = c.category_id
 LEFT JOIN order_items oi ON p.product_id = oi.product_id
 GROUP BY p.product_id, p.product_name, c.category_name, p.price, p.stock_quantity;
 
+-- Daily rollups backing the analytics dashboard, refreshed on a schedule off
+-- the request path by scripts/refresh_views.py, or with pg_cron:
+--   SELECT cron.schedule('refresh-dashboard-metrics', '*/5 * * * *', $$
+--       SELECT refresh_materialized_view('dashboard_metrics_daily');
+--       SELECT refresh_materialized_view('dashboard_product_revenue_daily');
+--       SELECT refresh_materialized_view('dashboard_city_revenue_daily')$$);
+CREATE MATERIALIZED VIEW dashboard_metrics_daily AS
+SELECT
+    order_date::date as order_day,
+    SUM(total_amount) as revenue,
+    COUNT(*) as order_count
+FROM orders
+GROUP BY order_date::date;
+
+-- CONCURRENTLY refresh requires a unique index
+CREATE UNIQUE INDEX idx_dashboard_metrics_daily_day ON dashboard_metrics_daily(order_day);
+
+-- Per-day revenue by product and by city for the dashboard's top-N panels.
+-- Orders fall on a single day and city, so daily sums add up exactly.
+CREATE MATERIALIZED VIEW dashboard_product_revenue_daily AS
+SELECT
+    o.order_date::date as order_day,
+    oi.product_id,
+    SUM(oi.total_price) as revenue
+FROM orders o
+JOIN order_items oi ON o.order_id = oi.order_id
+GROUP BY o.order_date::date, oi.product_id;
+
+CREATE UNIQUE INDEX idx_dashboard_product_revenue_daily ON dashboard_product_revenue_daily(order_day, product_id);
+
+CREATE MATERIALIZED VIEW dashboard_city_revenue_daily AS
+SELECT
+    o.order_date::date as order_day,
+    c.city,
+    SUM(o.total_amount) as revenue,
+    COUNT(*) as order_count
+FROM orders o
+JOIN customers c ON o.customer_id = c.customer_id
+WHERE c.city IS NOT NULL
+GROUP BY o.order_date::date, c.city;
+
+CREATE UNIQUE INDEX idx_dashboard_city_revenue_daily ON dashboard_city_revenue_daily(order_day, city);
+
 -- Print success message
 SELECT 'Database schema created successfully!' as status;
\ No newline at end of file
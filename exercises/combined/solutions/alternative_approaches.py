@@ -3,35 +3,164 @@ Alternative Solution Approaches for Study
 These show different ways to solve the same problems
 """
 
+from src.cache import CachedDatabase, TTLCache
 from src.database import Database
-from typing import List, Dict, Any, Optional
+import copy
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from itertools import accumulate
+from typing import Callable, Iterable, Iterator, List, Dict, Any, FrozenSet, Optional, Tuple
+
+# Customer segment definitions, each returning the matching customer names
+SEGMENT_QUERIES = {
+    'frequent': """
+        SELECT c.customer_name
+        FROM customers c
+        JOIN orders o ON c.customer_id = o.customer_id
+        WHERE o.order_date >= CURRENT_DATE - INTERVAL '6 months'
+        GROUP BY c.customer_id, c.customer_name
+        HAVING COUNT(o.order_id) > 5
+    """,
+    'big_spender': """
+        SELECT customer_name
+        FROM customer_order_summary
+        WHERE total_orders > 0 AND (total_spent / total_orders) > 200
+    """,
+    'at_risk': """
+        SELECT customer_name
+        FROM customer_order_summary
+        WHERE total_orders > 0
+          AND last_order_date < CURRENT_DATE - INTERVAL '3 months'
+    """,
+    'new': """
+        SELECT customer_name
+        FROM customer_order_summary
+        WHERE first_order_date > CURRENT_DATE - INTERVAL '1 month'
+    """
+}
+
+# CACHING FOR EXPENSIVE, RARELY-CHANGING ANALYTICS
+
+# Each cache with the tables its method reads
+_analytics_caches: List[Tuple[TTLCache, FrozenSet[str]]] = []
+
+def cached_analytics(tables: Iterable[str], ttl: int = 600, key_prefix: str = 'analytics',
+                     maxsize: int = 256) -> Callable:
+    """Alternative: Cache an analytics method's result per database and arguments.
+
+    `tables` are the tables (or materialized views) the method reads. On a
+    CachedDatabase the key includes their invalidation versions, so any write
+    or view refresh it sees (directly or through listen_for_invalidations)
+    retires the cached result. On a plain Database, writers call
+    invalidate_analytics_cache(tables); writes made elsewhere can be served
+    stale for up to `ttl` seconds.
+    """
+    tables = frozenset(table.lower() for table in tables)
+
+    def decorator(func: Callable) -> Callable:
+        cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        _analytics_caches.append((cache, tables))
+
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            versions = self.db.table_versions(sorted(tables)) if isinstance(self.db, CachedDatabase) else None
+            key = (key_prefix, func.__qualname__, self.db, versions, args, frozenset(kwargs.items()))
+            cached = cache.get(key)
+            if cached is not None:
+                # Each caller gets its own copy so edits can't leak into the cache
+                return copy.deepcopy(cached)
+
+            result = func(self, *args, **kwargs)
+            cache.set(key, copy.deepcopy(result))
+            return result
+
+        return wrapper
+    return decorator
+
+def invalidate_analytics_cache(tables: Optional[Iterable[str]] = None) -> None:
+    """Drop cached analytics results that read any of `tables`, or all of them (e.g. after an ETL load)."""
+    written = None if tables is None else {table.lower() for table in tables}
+    for cache, read_tables in _analytics_caches:
+        if written is None or not read_tables.isdisjoint(written):
+            cache.clear()
+
+def _to_columns(fields, rows) -> Dict[str, List[Any]]:
+    """Transpose row tuples into one list per field (struct-of-arrays)."""
+    columns = list(zip(*rows)) or [()] * len(fields)
+    return {field: list(column) for field, column in zip(fields, columns)}
 
 # ALTERNATIVE APPROACHES FOR CUSTOMER RETENTION
 
+# Hot customer queries, PREPAREd once per connection and run with EXECUTE
+_TOP_CUSTOMERS_SQL = """
+    SELECT
+      customer_name,
+      total_spent,
+      total_orders as order_count
+    FROM customer_order_summary
+    ORDER BY total_spent DESC
+    LIMIT $1
+"""
+
+# Both customer sets are built once, so the retained check is a hash
+# lookup rather than an orders probe per base customer
+_RETENTION_SEMI_JOIN_SQL = """
+    WITH base_customers AS (
+        SELECT DISTINCT customer_id
+        FROM orders
+        WHERE order_date >= CURRENT_DATE - make_interval(months => $1 + 1)
+          AND order_date < CURRENT_DATE - make_interval(months => $1)
+    ),
+    recent_customers AS (
+        SELECT DISTINCT customer_id
+        FROM orders
+        WHERE order_date >= CURRENT_DATE - make_interval(months => 1)
+    )
+    SELECT
+        COUNT(*) as total_past,
+        COUNT(*) FILTER (
+            WHERE b.customer_id IN (SELECT customer_id FROM recent_customers)
+        ) as retained
+    FROM base_customers b
+"""
+
+_RETENTION_SINGLE_QUERY_SQL = """
+    WITH recent_customers AS (
+        SELECT DISTINCT customer_id
+        FROM orders
+        WHERE order_date >= CURRENT_DATE - make_interval(months => 1)
+    )
+    SELECT
+        COUNT(DISTINCT o.customer_id) as past_customers,
+        COUNT(DISTINCT o.customer_id) FILTER (
+            WHERE EXISTS (
+                SELECT 1 FROM recent_customers r
+                WHERE r.customer_id = o.customer_id
+            )
+        ) as retained_customers
+    FROM orders o
+    WHERE o.order_date >= CURRENT_DATE - make_interval(months => $1 + 1)
+      AND o.order_date < CURRENT_DATE - make_interval(months => $1)
+"""
+
 class CustomerAnalyticsAlternatives:
     def __init__(self, db: Database):
         self.db = db
+        self.db.prepare('top_customers', _TOP_CUSTOMERS_SQL, ('int',))
+        self.db.prepare('retention_semi_join', _RETENTION_SEMI_JOIN_SQL, ('int',))
+        self.db.prepare('retention_single_query', _RETENTION_SINGLE_QUERY_SQL, ('int',))
 
+    @cached_analytics(tables=('customer_order_summary',))
     def top_customers_with_cos(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Alternative: simpler query based on customer_order_summary table"""
 
-        query = """
-            SELECT
-              customer_name,
-              total_spent,
-              order_count
-            FROM customer_order_summary
-            ORDER BY total_spent DESC
-            LIMIT %s
-        """
-
-        rows = self.db.execute_query(query, (limit,))
+        rows = self.db.execute_prepared('top_customers', (limit,))
 
         if rows:
             return [
                 {
                     'customer_name': row[0],
-                    'total_spent': float(row[1]),
+                    'total_spent': row[1],
                     'order_count': row[2]
                 }
                 for row in rows
@@ -39,27 +168,8 @@ class CustomerAnalyticsAlternatives:
         return []
 
     def retention_rate_with_exists(self, months_back: int = 6) -> float:
-        """Alternative: Using EXISTS instead of JOIN for intersection."""
-        query = """
-            WITH base_customers AS (
-                SELECT DISTINCT customer_id
-                FROM orders
-                WHERE order_date >= CURRENT_DATE - INTERVAL '%s months' - INTERVAL '1 month'
-                  AND order_date < CURRENT_DATE - INTERVAL '%s months'
-            )
-            SELECT
-                COUNT(*) as total_past,
-                COUNT(CASE
-                    WHEN EXISTS (
-                        SELECT 1 FROM orders recent
-                        WHERE recent.customer_id = base_customers.customer_id
-                          AND recent.order_date >= CURRENT_DATE - INTERVAL '1 month'
-                    ) THEN 1
-                END) as retained
-            FROM base_customers
-        """
-
-        result = self.db.execute_query(query, (months_back, months_back))
+        """Alternative: Semi-join against the set of recent customers."""
+        result = self.db.execute_prepared('retention_semi_join', (months_back,))
         if result and result[0][0] > 0:
             total, retained = result[0]
             return (retained / total) * 100.0
@@ -67,90 +177,59 @@ class CustomerAnalyticsAlternatives:
 
     def retention_rate_single_query(self, months_back: int = 6) -> float:
         """Alternative: Single query with conditional aggregation."""
-        query = """
-            SELECT
-                COUNT(DISTINCT CASE
-                    WHEN order_date >= CURRENT_DATE - INTERVAL '%s months' - INTERVAL '1 month'
-                     AND order_date < CURRENT_DATE - INTERVAL '%s months'
-                    THEN customer_id
-                END) as past_customers,
-                COUNT(DISTINCT CASE
-                    WHEN order_date >= CURRENT_DATE - INTERVAL '%s months' - INTERVAL '1 month'
-                     AND order_date < CURRENT_DATE - INTERVAL '%s months'
-                     AND customer_id IN (
-                         SELECT DISTINCT customer_id FROM orders
-                         WHERE order_date >= CURRENT_DATE - INTERVAL '1 month'
-                     )
-                    THEN customer_id
-                END) as retained_customers
-            FROM orders
-        """
-
-        result = self.db.execute_query(query, (months_back, months_back, months_back, months_back))
+        result = self.db.execute_prepared('retention_single_query', (months_back,))
         if result and result[0][0] > 0:
             past, retained = result[0]
             return (retained / past) * 100.0
         return 0.0
 
     def customer_segments_separate_queries(self) -> Dict[str, List[str]]:
-        """Alternative: Separate queries instead of CTEs with UNION."""
-        segments = {'frequent': [], 'big_spender': [], 'at_risk': [], 'new': []}
-
-        # Query 1: Frequent customers
-        frequent_query = """
-            SELECT customer_name
-            FROM customers c
-            JOIN orders o ON c.customer_id = o.customer_id
-            WHERE o.order_date >= CURRENT_DATE - INTERVAL '6 months'
-            GROUP BY c.customer_id, c.customer_name
-            HAVING COUNT(o.order_id) > 5
-        """
+        """Alternative: Independent per-segment queries sent as one UNION ALL."""
+        segments = {name: [] for name in SEGMENT_QUERIES}
 
-        # Query 2: Big spenders
-        big_spender_query = """
-            SELECT customer_name
-            FROM customer_order_summary
-            WHERE total_orders > 0 AND (total_spent / total_orders) > 200
-        """
-
-        # Query 3: At risk
-        at_risk_query = """
-            SELECT customer_name
-            FROM customer_order_summary
-            WHERE total_orders > 0
-              AND last_order_date < CURRENT_DATE - INTERVAL '3 months'
-        """
+        # Each branch is still its own query, tagged with the segment name,
+        # so all four run in one round trip and are bucketed client-side
+        query = "\nUNION ALL\n".join(
+            f"SELECT '{name}' as segment, customer_name FROM ({segment_query}) {name}_customers"
+            for name, segment_query in SEGMENT_QUERIES.items()
+        )
 
-        # Query 4: New customers
-        new_query = """
-            SELECT customer_name
-            FROM customer_order_summary
-            WHERE first_order_date > CURRENT_DATE - INTERVAL '1 month'
-        """
+        result = self.db.execute_query(query)
+        if result:
+            for segment_name, customer_name in result:
+                segments[segment_name].append(customer_name)
 
-        # Execute each query separately
-        queries = [
-            (frequent_query, 'frequent'),
-            (big_spender_query, 'big_spender'),
-            (at_risk_query, 'at_risk'),
-            (new_query, 'new')
-        ]
+        return segments
 
-        for query, segment_name in queries:
-            result = self.db.execute_query(query)
-            if result:
-                segments[segment_name] = [row[0] for row in result]
+    def customer_segments_concurrent(self, max_workers: int = 4) -> Dict[str, List[str]]:
+        """Alternative: Run the segment queries in parallel, one connection each."""
+        def run_segment(segment_query: str) -> List[str]:
+            # psycopg2 serializes queries on a shared connection, so each
+            # worker needs its own to actually overlap with the others
+            db = Database()
+            try:
+                result = db.execute_query(segment_query)
+                return [row[0] for row in result] if result else []
+            finally:
+                db.close()
 
-        return segments
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(run_segment, SEGMENT_QUERIES.values())
+            return dict(zip(SEGMENT_QUERIES, results))
 
 # ALTERNATIVE APPROACHES FOR SALES ANALYTICS
 
+_PERFORMANCE_FIELDS = (
+    'product_name', 'category', 'total_revenue', 'units_sold',
+    'avg_rating', 'revenue_rank', 'performance_category'
+)
+
 class SalesAnalyticsAlternatives:
     def __init__(self, db: Database):
         self.db = db
 
     def monthly_trends_self_join(self, year: int = 2023) -> List[Dict[str, Any]]:
-        """Alternative: Using self-join instead of window functions."""
+        """Alternative: Month-over-month growth with a named LAG window."""
         query = """
             WITH monthly_data AS (
                 SELECT
@@ -163,17 +242,17 @@ class SalesAnalyticsAlternatives:
                 GROUP BY EXTRACT(MONTH FROM order_date)
             )
             SELECT
-                current.month,
-                current.revenue,
-                current.order_count,
-                current.avg_order_value,
+                month,
+                revenue,
+                order_count,
+                avg_order_value,
                 CASE
-                    WHEN previous.revenue IS NULL OR previous.revenue = 0 THEN 0
-                    ELSE ((current.revenue - previous.revenue) / previous.revenue) * 100
+                    WHEN LAG(revenue) OVER w IS NULL OR LAG(revenue) OVER w = 0 THEN 0
+                    ELSE ((revenue - LAG(revenue) OVER w) / LAG(revenue) OVER w) * 100
                 END as growth_rate
-            FROM monthly_data current
-            LEFT JOIN monthly_data previous ON current.month = previous.month + 1
-            ORDER BY current.month
+            FROM monthly_data
+            WINDOW w AS (ORDER BY month)
+            ORDER BY month
         """
 
         rows = self.db.execute_query(query, (year,))
@@ -182,62 +261,75 @@ class SalesAnalyticsAlternatives:
             return [
                 {
                     'month': int(row[0]),
-                    'revenue': float(row[1]),
+                    'revenue': row[1],
                     'order_count': row[2],
-                    'avg_order_value': float(row[3]),
-                    'growth_rate': float(row[4]) if row[4] else 0.0
+                    'avg_order_value': row[3],
+                    'growth_rate': row[4] or 0.0
                 }
                 for row in rows
             ]
         return []
 
-    def product_performance_with_ranking(self) -> List[Dict[str, Any]]:
+    @cached_analytics(tables=('products', 'categories', 'order_items'))
+    def product_performance_with_ranking(self, as_columns: bool = False):
         """Alternative: Add ranking and performance categories."""
+        if as_columns:
+            return _to_columns(_PERFORMANCE_FIELDS, self._product_performance_rows())
+        return list(self.iter_product_performance())
+
+    def iter_product_performance(self) -> Iterator[Dict[str, Any]]:
+        """Stream product performance rows for catalogs too large to buffer."""
+        # Columns arrive already typed (float8 casts happen in the database),
+        # so each row maps straight onto the field names
+        for row in self._product_performance_rows():
+            yield dict(zip(_PERFORMANCE_FIELDS, row))
+
+    def _product_performance_rows(self) -> Iterator[tuple]:
         query = """
+            WITH product_totals AS (
+                SELECT
+                    p.product_id,
+                    p.product_name,
+                    c.category_name,
+                    p.average_rating,
+                    COALESCE(SUM(oi.total_price), 0) as total_revenue,
+                    COALESCE(SUM(oi.quantity), 0) as units_sold
+                FROM products p
+                JOIN categories c ON p.category_id = c.category_id
+                LEFT JOIN order_items oi ON p.product_id = oi.product_id
+                GROUP BY p.product_id, p.product_name, c.category_name, p.average_rating
+            )
             SELECT
-                p.product_name,
-                c.category_name,
-                COALESCE(SUM(oi.total_price), 0) as total_revenue,
-                COALESCE(SUM(oi.quantity), 0) as units_sold,
-                p.average_rating,
-                RANK() OVER (ORDER BY COALESCE(SUM(oi.total_price), 0) DESC) as revenue_rank,
+                product_name,
+                category_name,
+                total_revenue::float8,
+                units_sold,
+                NULLIF(average_rating, 0)::float8,
+                RANK() OVER (ORDER BY total_revenue DESC) as revenue_rank,
                 CASE
-                    WHEN COALESCE(SUM(oi.total_price), 0) = 0 THEN 'No Sales'
-                    WHEN COALESCE(SUM(oi.total_price), 0) < 1000 THEN 'Low Performer'
-                    WHEN COALESCE(SUM(oi.total_price), 0) < 5000 THEN 'Medium Performer'
+                    WHEN total_revenue = 0 THEN 'No Sales'
+                    WHEN total_revenue < 1000 THEN 'Low Performer'
+                    WHEN total_revenue < 5000 THEN 'Medium Performer'
                     ELSE 'High Performer'
                 END as performance_category
-            FROM products p
-            JOIN categories c ON p.category_id = c.category_id
-            LEFT JOIN order_items oi ON p.product_id = oi.product_id
-            GROUP BY p.product_id, p.product_name, c.category_name, p.average_rating
+            FROM product_totals
             ORDER BY total_revenue DESC
         """
 
-        rows = self.db.execute_query(query)
-
-        if rows:
-            return [
-                {
-                    'product_name': row[0],
-                    'category': row[1],
-                    'total_revenue': float(row[2]),
-                    'units_sold': int(row[3]),
-                    'avg_rating': float(row[4]) if row[4] else None,
-                    'revenue_rank': row[5],
-                    'performance_category': row[6]
-                }
-                for row in rows
-            ]
-        return []
+        return self.db.iter_query(query)
 
 # ALTERNATIVE APPROACHES FOR INVENTORY OPTIMIZATION
 
+_REORDER_FIELDS = (
+    'product_id', 'product_name', 'current_stock', 'avg_daily_sales', 'reorder_point',
+    'lead_time_demand', 'safety_stock', 'priority', 'recommended_order_qty'
+)
+
 class InventoryOptimizerAlternatives:
     def __init__(self, db: Database):
         self.db = db
 
-    def reorder_recommendations_safety_stock(self) -> List[Dict[str, Any]]:
+    def reorder_recommendations_safety_stock(self, as_columns: bool = False):
         """Alternative: Using safety stock model instead of simple days calculation."""
         query = """
             WITH sales_analysis AS (
@@ -249,9 +341,14 @@ class InventoryOptimizerAlternatives:
                     COALESCE(STDDEV(oi.quantity), 0) as sales_stddev,
                     COUNT(oi.order_item_id) as sales_days
                 FROM products p
-                LEFT JOIN order_items oi ON p.product_id = oi.product_id
-                LEFT JOIN orders o ON oi.order_id = o.order_id
-                WHERE o.order_date >= CURRENT_DATE - INTERVAL '30 days'
+                -- The date filter belongs to the joined sales, not to WHERE, so
+                -- products with no recent orders survive the outer join
+                LEFT JOIN (
+                    order_items oi
+                    JOIN orders o
+                      ON oi.order_id = o.order_id
+                     AND o.order_date >= CURRENT_DATE - INTERVAL '30 days'
+                ) ON p.product_id = oi.product_id
                 GROUP BY p.product_id, p.product_name, p.stock_quantity
             ),
             reorder_analysis AS (
@@ -289,111 +386,103 @@ class InventoryOptimizerAlternatives:
                 stock_quantity / avg_daily_sales ASC
         """
 
-        rows = self.db.execute_query(query)
+        rows = self.db.execute_query(query) or []
+
+        records = [
+            (
+                row[0],
+                row[1],
+                row[2],
+                round(row[3], 2),
+                round(row[4], 0),
+                round(row[5], 0),
+                round(row[6], 0),
+                row[7],
+                max(50, int(row[3] * 30))  # 30 days or minimum 50
+            )
+            for row in rows
+        ]
 
-        if rows:
-            return [
-                {
-                    'product_id': row[0],
-                    'product_name': row[1],
-                    'current_stock': row[2],
-                    'avg_daily_sales': round(float(row[3]), 2),
-                    'reorder_point': round(float(row[4]), 0),
-                    'lead_time_demand': round(float(row[5]), 0),
-                    'safety_stock': round(float(row[6]), 0),
-                    'priority': row[7],
-                    'recommended_order_qty': max(50, int(row[3] * 30))  # 30 days or minimum 50
-                }
-                for row in rows
-            ]
-        return []
+        if as_columns:
+            return _to_columns(_REORDER_FIELDS, records)
+        return [dict(zip(_REORDER_FIELDS, record)) for record in records]
 
+    @cached_analytics(tables=('products', 'categories', 'order_items'))
     def abc_analysis_revenue_and_margin(self) -> Dict[str, List[Dict[str, Any]]]:
         """Alternative: ABC analysis considering both revenue and profit margin."""
+        # Only per-product totals come from the database; the running
+        # percentages and classes are a single pass over the sorted rows
         query = """
-            WITH product_metrics AS (
-                SELECT
-                    p.product_id,
-                    p.product_name,
-                    c.category_name,
-                    COALESCE(SUM(oi.total_price), 0) as total_revenue,
-                    COALESCE(SUM(oi.quantity * (oi.unit_price - p.cost)), 0) as total_profit,
-                    CASE
-                        WHEN SUM(oi.total_price) > 0
-                        THEN (SUM(oi.quantity * (oi.unit_price - p.cost)) / SUM(oi.total_price)) * 100
-                        ELSE 0
-                    END as profit_margin_percent
-                FROM products p
-                JOIN categories c ON p.category_id = c.category_id
-                LEFT JOIN order_items oi ON p.product_id = oi.product_id
-                GROUP BY p.product_id, p.product_name, c.category_name, p.cost
-            ),
-            revenue_percentiles AS (
-                SELECT
-                    *,
-                    SUM(total_revenue) OVER() as total_all_revenue,
-                    SUM(total_revenue) OVER(ORDER BY total_revenue DESC) as running_revenue,
-                    SUM(total_profit) OVER() as total_all_profit,
-                    SUM(total_profit) OVER(ORDER BY total_profit DESC) as running_profit
-                FROM product_metrics
-                WHERE total_revenue > 0
-            ),
-            classified AS (
-                SELECT
-                    *,
-                    (running_revenue / total_all_revenue) * 100 as revenue_cumulative_percent,
-                    (running_profit / total_all_profit) * 100 as profit_cumulative_percent,
-                    -- Weighted classification considering both revenue and profit
-                    CASE
-                        WHEN (running_revenue / total_all_revenue) * 100 <= 70
-                             AND (running_profit / total_all_profit) * 100 <= 70 THEN 'A'
-                        WHEN (running_revenue / total_all_revenue) * 100 <= 90
-                             AND (running_profit / total_all_profit) * 100 <= 90 THEN 'B'
-                        ELSE 'C'
-                    END as abc_class
-                FROM revenue_percentiles
-            )
             SELECT
-                abc_class,
-                product_name,
-                category_name,
-                total_revenue,
-                total_profit,
-                profit_margin_percent,
-                revenue_cumulative_percent,
-                profit_cumulative_percent
-            FROM classified
+                p.product_name,
+                c.category_name,
+                SUM(oi.total_price)::float8 as total_revenue,
+                SUM(oi.quantity * (oi.unit_price - p.cost))::float8 as total_profit,
+                ROUND(SUM(oi.quantity * (oi.unit_price - p.cost)) / SUM(oi.total_price) * 100, 2)::float8
+                    as profit_margin_percent
+            FROM products p
+            JOIN categories c ON p.category_id = c.category_id
+            JOIN order_items oi ON p.product_id = oi.product_id
+            GROUP BY p.product_id, p.product_name, c.category_name, p.cost
+            HAVING SUM(oi.total_price) > 0
             ORDER BY total_revenue DESC
         """
 
         rows = self.db.execute_query(query)
         result = {'A': [], 'B': [], 'C': []}
-
-        if rows:
-            for row in rows:
-                abc_class = row[0]
-                result[abc_class].append({
-                    'product_name': row[1],
-                    'category': row[2],
-                    'total_revenue': float(row[3]),
-                    'total_profit': float(row[4]),
-                    'profit_margin_percent': round(float(row[5]), 2),
-                    'revenue_cumulative_percent': round(float(row[6]), 2),
-                    'profit_cumulative_percent': round(float(row[7]), 2)
-                })
+        if not rows:
+            return result
+
+        revenues = [row[2] for row in rows]
+        profits = [row[3] for row in rows]
+        total_revenue = sum(revenues)
+        total_profit = sum(profits) or 1.0
+
+        revenue_percents = [running / total_revenue * 100 for running in accumulate(revenues)]
+
+        # Profit runs in its own (profit DESC) order, then maps back to revenue order
+        profit_order = sorted(range(len(rows)), key=profits.__getitem__, reverse=True)
+        profit_percents = [0.0] * len(rows)
+        for i, running in zip(profit_order, accumulate(profits[i] for i in profit_order)):
+            profit_percents[i] = running / total_profit * 100
+
+        for row, revenue_percent, profit_percent in zip(rows, revenue_percents, profit_percents):
+            # Weighted classification considering both revenue and profit
+            if revenue_percent <= 70 and profit_percent <= 70:
+                abc_class = 'A'
+            elif revenue_percent <= 90 and profit_percent <= 90:
+                abc_class = 'B'
+            else:
+                abc_class = 'C'
+
+            result[abc_class].append({
+                'product_name': row[0],
+                'category': row[1],
+                'total_revenue': row[2],
+                'total_profit': row[3],
+                'profit_margin_percent': row[4],
+                'revenue_cumulative_percent': round(revenue_percent, 2),
+                'profit_cumulative_percent': round(profit_percent, 2)
+            })
 
         return result
 
 # ALTERNATIVE APPROACHES FOR API DESIGN
 
+UPSERT_CHUNK_SIZE = 500
+
 class APIDesignAlternatives:
     def __init__(self, db: Database):
         self.db = db
 
     def search_products_with_full_text(self, query: str, **filters) -> Dict[str, Any]:
         """Alternative: Using PostgreSQL full-text search instead of LIKE."""
-        # Note: This requires setting up text search in PostgreSQL
+        # search_tsv is a stored generated column with a GIN index (see schema.sql),
+        # and the tsquery is parsed once in the CTE
         search_query = """
+            WITH q AS (
+                SELECT plainto_tsquery('english', %s) as query
+            )
             SELECT
                 p.product_id,
                 p.product_name,
@@ -402,20 +491,16 @@ class APIDesignAlternatives:
                 p.stock_quantity,
                 p.average_rating,
                 c.category_name,
-                -- Full-text search ranking
-                ts_rank_cd(
-                    to_tsvector('english', p.product_name || ' ' || COALESCE(p.description, '')),
-                    plainto_tsquery('english', %s)
-                ) as search_rank
+                ts_rank_cd(p.search_tsv, q.query) as search_rank
             FROM products p
             JOIN categories c ON p.category_id = c.category_id
-            WHERE to_tsvector('english', p.product_name || ' ' || COALESCE(p.description, ''))
-                  @@ plainto_tsquery('english', %s)
+            CROSS JOIN q
+            WHERE p.search_tsv @@ q.query
             ORDER BY search_rank DESC, p.product_name
             LIMIT 20
         """
 
-        result = self.db.execute_query(search_query, (query, query))
+        result = self.db.execute_query(search_query, (query,))
 
         if result:
             return {
@@ -424,11 +509,11 @@ class APIDesignAlternatives:
                         'product_id': row[0],
                         'product_name': row[1],
                         'description': row[2],
-                        'price': float(row[3]),
+                        'price': row[3],
                         'stock_quantity': row[4],
-                        'average_rating': float(row[5]) if row[5] else None,
+                        'average_rating': row[5] or None,
                         'category': row[6],
-                        'search_rank': float(row[7])
+                        'search_rank': row[7]
                     }
                     for row in result
                 ],
@@ -441,7 +526,7 @@ class APIDesignAlternatives:
         """Alternative: Using PostgreSQL UPSERT (ON CONFLICT) for bulk operations."""
         upsert_query = """
             INSERT INTO products (product_id, product_name, price, stock_quantity, category_id)
-            VALUES (%s, %s, %s, %s, %s)
+            VALUES %s
             ON CONFLICT (product_id)
             DO UPDATE SET
                 product_name = EXCLUDED.product_name,
@@ -451,31 +536,52 @@ class APIDesignAlternatives:
             RETURNING product_id, 'upserted' as operation
         """
 
+        rows = [
+            (
+                product_data.get('product_id'),
+                product_data.get('product_name'),
+                product_data.get('price'),
+                product_data.get('stock_quantity'),
+                product_data.get('category_id')
+            )
+            for product_data in products_data
+        ]
+
         results = []
-        for product_data in products_data:
-            try:
-                result = self.db.execute_query(upsert_query, (
-                    product_data.get('product_id'),
-                    product_data.get('product_name'),
-                    product_data.get('price'),
-                    product_data.get('stock_quantity'),
-                    product_data.get('category_id')
-                ))
 
+        # One short transaction per chunk keeps row locks brief under concurrent
+        # writers; skipping the synchronous WAL flush suits re-runnable bulk loads
+        for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            chunk = rows[start:start + UPSERT_CHUNK_SIZE]
+            chunk_result = self.db.execute_many(upsert_query, chunk, synchronous_commit=False)
+
+            if chunk_result is not None:
+                results.extend(
+                    {'product_id': row[0], 'operation': row[1], 'success': True}
+                    for row in chunk_result
+                )
+                continue
+
+            # The chunk was rolled back as a unit; retry its rows one by one
+            # so only the offending products are reported as failed
+            for row in chunk:
+                result = self.db.execute_many(upsert_query, [row], synchronous_commit=False)
                 if result:
                     results.append({
                         'product_id': result[0][0],
                         'operation': result[0][1],
                         'success': True
                     })
+                else:
+                    results.append({
+                        'product_id': row[0],
+                        'operation': 'failed',
+                        'success': False,
+                        'error': 'Upsert failed'
+                    })
 
-            except Exception as e:
-                results.append({
-                    'product_id': product_data.get('product_id'),
-                    'operation': 'failed',
-                    'success': False,
-                    'error': str(e)
-                })
+        # Product names, prices and stock feed the cached performance and ABC reports
+        invalidate_analytics_cache(('products',))
 
         return {
             'total_operations': len(products_data),
@@ -485,7 +591,12 @@ class APIDesignAlternatives:
 
 # PERFORMANCE-ORIENTED ALTERNATIVES
 
-def get_customer_metrics_materialized_view(db: Database) -> List[Dict[str, Any]]:
+_CUSTOMER_METRICS_FIELDS = (
+    'customer_id', 'customer_name', 'total_orders', 'total_spent',
+    'avg_order_value', 'last_order_date', 'predicted_clv'
+)
+
+def get_customer_metrics_materialized_view(db: Database, as_columns: bool = False):
     """Alternative: Using materialized views for expensive calculations."""
     # This would require creating a materialized view first:
     create_view_query = """
@@ -509,66 +620,36 @@ def get_customer_metrics_materialized_view(db: Database) -> List[Dict[str, Any]]
     LEFT JOIN orders o ON c.customer_id = o.customer_id
     GROUP BY c.customer_id, c.customer_name;
 
-    CREATE INDEX IF NOT EXISTS idx_customer_metrics_mv_clv ON customer_metrics_mv(predicted_clv);
+    -- Covers the top-N read below: an index-only scan returns rows already in order
+    CREATE INDEX IF NOT EXISTS idx_customer_metrics_mv_clv_desc ON customer_metrics_mv (predicted_clv DESC)
+        INCLUDE (customer_id, customer_name, total_orders, total_spent, avg_order_value, last_order_date);
     """
 
     # In production, you'd refresh this periodically:
     # REFRESH MATERIALIZED VIEW customer_metrics_mv;
 
-    query = "SELECT * FROM customer_metrics_mv ORDER BY predicted_clv DESC LIMIT 100"
-    result = db.execute_query(query)
-
-    if result:
-        return [
-            {
-                'customer_id': row[0],
-                'customer_name': row[1],
-                'total_orders': row[2],
-                'total_spent': float(row[3]),
-                'avg_order_value': float(row[4]),
-                'last_order_date': row[5].strftime('%Y-%m-%d') if row[5] else None,
-                'predicted_clv': round(float(row[6]), 2)
-            }
-            for row in result
-        ]
-
-    return []
-
-def cached_analytics_with_redis_pattern(db: Database, cache_key: str, ttl: int = 3600):
-    """Alternative: Caching pattern for expensive analytics queries."""
-    # This is a conceptual example - would need Redis or similar
-
-    # Pseudo-code for caching pattern:
+    query = """
+        SELECT customer_id, customer_name, total_orders, total_spent,
+               avg_order_value, last_order_date, predicted_clv
+        FROM customer_metrics_mv
+        ORDER BY predicted_clv DESC
+        LIMIT 100
     """
-    import redis
-    import json
-    import hashlib
-
-    def get_cached_analytics(db, query, params, cache_key, ttl=3600):
-        r = redis.Redis()
-
-        # Create cache key from query and params
-        full_key = f"analytics:{cache_key}:{hashlib.md5(str(params).encode()).hexdigest()}"
-
-        # Try to get from cache first
-        cached_result = r.get(full_key)
-        if cached_result:
-            return json.loads(cached_result)
-
-        # If not in cache, execute query
-        result = db.execute_query(query, params)
-        processed_result = process_analytics_result(result)
-
-        # Store in cache
-        r.setex(full_key, ttl, json.dumps(processed_result))
-
-        return processed_result
-    """
-
-    # For this example, just return a placeholder
-    return {
-        'cache_strategy': 'redis_with_ttl',
-        'ttl_seconds': ttl,
-        'cache_key': cache_key,
-        'note': 'This would use Redis or similar caching system in production'
-    }
\ No newline at end of file
+    result = db.execute_query(query) or []
+
+    records = [
+        (
+            row[0],
+            row[1],
+            row[2],
+            row[3],
+            row[4],
+            row[5].date().isoformat() if row[5] else None,
+            round(row[6], 2)
+        )
+        for row in result
+    ]
+
+    if as_columns:
+        return _to_columns(_CUSTOMER_METRICS_FIELDS, records)
+    return [dict(zip(_CUSTOMER_METRICS_FIELDS, record)) for record in records]
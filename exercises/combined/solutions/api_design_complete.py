@@ -4,93 +4,218 @@ These demonstrate robust API patterns, validation, and error handling
 """
 
 from src.database import Database
-from typing import List, Dict, Any, Optional
+from src.cache import TTLCache
+from typing import List, Dict, Any, Optional, Set, Tuple, Callable, Iterable, Iterator
+import base64
+import binascii
+from collections import defaultdict
+import copy
 import json
+import re
+from dataclasses import asdict, is_dataclass
 from datetime import datetime, date
+from decimal import Decimal
+from functools import lru_cache
 import psycopg2
+from psycopg2.extras import execute_values
+
+# Dashboard aggregates are expensive and only need to be near-real-time
+_dashboard_cache = TTLCache(maxsize=32, ttl=300)
+# Keyed by (product_id, limit)
+_recommendation_cache = TTLCache(maxsize=10_000, ttl=600)
+# Keyed by customer_id; short TTL bounds staleness from writes made elsewhere
+_profile_cache = TTLCache(maxsize=10_000, ttl=60)
+
+# One local part, one '@', a dotted domain, no whitespace; compiled once at import
+_EMAIL_PATTERN = re.compile(r'[^@\s]+@[^@\s.]+(?:\.[^@\s.]+)+')
+
+# Profile keys selectable through get_user_profile(fields=...), in SELECT order
+_PROFILE_COLUMNS = {
+    'user_id': 'c.customer_id',
+    'customer_name': 'c.customer_name',
+    'email': 'c.email',
+    'phone': 'c.phone',
+    'city': 'c.city',
+    'state': 'c.state',
+    'country': 'c.country',
+    'registration_date': 'c.registration_date',
+    'preferences': 'c.preferences',
+}
+
+# One customer's order totals, read live from orders (an idx_orders_cust_date
+# range) so a profile reflects the customer's own orders right after they are written
+_PROFILE_SUMMARY_SQL = """
+    SELECT
+        COUNT(*) as total_orders,
+        SUM(o.total_amount) as total_spent,
+        MAX(o.order_date) as last_order_date
+    FROM orders o
+    WHERE o.customer_id = c.customer_id
+"""
+
+# Hot single-row lookups, PREPAREd once per connection and run with EXECUTE
+_USER_PROFILE_SQL = f"""
+    SELECT
+        c.customer_id,
+        c.customer_name,
+        c.email,
+        c.phone,
+        c.city,
+        c.state,
+        c.country,
+        c.registration_date,
+        c.preferences,
+        cos.total_orders,
+        cos.total_spent,
+        cos.last_order_date
+    FROM customers c
+    LEFT JOIN LATERAL ({_PROFILE_SUMMARY_SQL}) cos ON true
+    WHERE c.customer_id = $1
+"""
+
+_ORDER_HEADER_SQL = """
+    SELECT
+        o.order_id,
+        o.customer_id,
+        c.customer_name,
+        o.order_date,
+        o.status,
+        o.total_amount,
+        o.tax_amount,
+        o.shipping_cost,
+        o.notes
+    FROM orders o
+    JOIN customers c ON o.customer_id = c.customer_id
+    WHERE o.order_id = $1
+"""
+
+_ORDER_ITEMS_SQL = """
+    SELECT
+        oi.product_id,
+        p.product_name,
+        oi.quantity,
+        oi.unit_price,
+        oi.total_price
+    FROM order_items oi
+    JOIN products p ON oi.product_id = p.product_id
+    WHERE oi.order_id = $1
+"""
+
+_CLV_SQL = """
+    SELECT
+        customer_id,
+        customer_name,
+        total_spent,
+        total_orders,
+        avg_order_value,
+        order_frequency_per_year,
+        predicted_clv,
+        last_order_date
+    FROM customer_order_summary
+"""
+
+# One customer's CLV straight from orders, so a lookup never waits on a
+# refresh; customer_clv() is the formula customer_order_summary uses too
+_CUSTOMER_CLV_SQL = """
+    SELECT
+        c.customer_id,
+        c.customer_name,
+        totals.total_spent,
+        totals.total_orders,
+        clv.avg_order_value,
+        clv.order_frequency_per_year,
+        clv.predicted_clv,
+        totals.last_order_date
+    FROM customers c
+    CROSS JOIN LATERAL (
+        SELECT
+            COUNT(o.order_id) as total_orders,
+            COALESCE(SUM(o.total_amount), 0) as total_spent,
+            MAX(o.order_date) as last_order_date,
+            MIN(o.order_date) as first_order_date
+        FROM orders o
+        WHERE o.customer_id = c.customer_id
+    ) totals
+    CROSS JOIN LATERAL customer_clv(
+        totals.total_spent, totals.total_orders, totals.first_order_date, totals.last_order_date
+    ) clv
+    WHERE c.customer_id = $1
+"""
 
 # Exercise 1: User Management API (15 minutes)
 class UserAPI:
     def __init__(self, db: Database):
         self.db = db
+        self._validate_new_user = make_validator(('customer_name', 'email'))
+        self.db.prepare('user_profile', _USER_PROFILE_SQL, ('int',))
 
     def create_user(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create user with comprehensive validation."""
         # Validate required fields
-        required_fields = ['customer_name', 'email']
-        missing_fields = [field for field in required_fields if not user_data.get(field)]
+        missing_fields = self._validate_new_user(user_data)
 
         if missing_fields:
             return format_api_response(False, error=f"Missing required fields: {', '.join(missing_fields)}")
 
-        # Validate email format (basic check)
+        # Validate email format in a single pass over the string
         email = user_data['email']
-        if '@' not in email or '.' not in email:
+        if len(email) > 254 or not _EMAIL_PATTERN.fullmatch(email):
             return format_api_response(False, error="Invalid email format")
 
-        # Check email uniqueness
-        check_query = "SELECT customer_id FROM customers WHERE email = %s"
-        existing = self.db.execute_query(check_query, (email,))
-
-        if existing:
-            return format_api_response(False, error="Email already exists")
-
-        # Insert new user
+        # The UNIQUE constraint on email decides atomically: a conflicting insert
+        # returns no row instead of racing a separate existence check
         insert_query = """
             INSERT INTO customers (customer_name, email, phone, city, state, country, preferences)
             VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (email) DO NOTHING
             RETURNING customer_id
         """
 
         try:
-            result = self.db.execute_query(insert_query, (
-                user_data['customer_name'],
-                user_data['email'],
-                user_data.get('phone'),
-                user_data.get('city'),
-                user_data.get('state'),
-                user_data.get('country', 'USA'),
-                json.dumps(user_data.get('preferences', {}))
-            ))
-
-            if result:
-                user_id = result[0][0]
-                return format_api_response(True, data={
-                    'user_id': user_id,
-                    'message': 'User created successfully'
-                })
-
+            # transaction() commits on exit; execute_query does not commit
+            # statements that return rows
+            with self.db.transaction() as cursor:
+                cursor.execute(insert_query, (
+                    user_data['customer_name'],
+                    email,
+                    user_data.get('phone'),
+                    user_data.get('city'),
+                    user_data.get('state'),
+                    user_data.get('country', 'USA'),
+                    _response_encoder.encode(user_data.get('preferences', {}))
+                ))
+                result = cursor.fetchone()
         except psycopg2.Error as e:
             return format_api_response(False, error=f"Database error: {str(e)}")
 
-        return format_api_response(False, error="Failed to create user")
+        if result is None:
+            return format_api_response(False, error="Email already exists")
 
-    def get_user_profile(self, user_id: int) -> Optional[Dict[str, Any]]:
-        """Get user profile with order summary using the view."""
-        query = """
-            SELECT
-                c.customer_id,
-                c.customer_name,
-                c.email,
-                c.phone,
-                c.city,
-                c.state,
-                c.country,
-                c.registration_date,
-                c.preferences,
-                cos.total_orders,
-                cos.total_spent,
-                cos.last_order_date
-            FROM customers c
-            LEFT JOIN customer_order_summary cos ON c.customer_id = cos.customer_id
-            WHERE c.customer_id = %s
+        return format_api_response(True, data={
+            'user_id': result[0],
+            'message': 'User created successfully'
+        })
+
+    def get_user_profile(self, user_id: int, fields: Optional[Set[str]] = None) -> Optional[Dict[str, Any]]:
+        """Get user profile with a live order summary.
+
+        Pass `fields` to fetch only those keys; unrequested columns (and the
+        order summary join) are left out of the query.
         """
+        cached = _profile_cache.get(user_id)
+        if cached is not None:
+            # preferences and order_summary are nested, so copy deeply
+            if fields is None:
+                return copy.deepcopy(cached)
+            return copy.deepcopy({k: v for k, v in cached.items() if k in fields})
+        if fields is not None:
+            return self._get_profile_fields(user_id, fields)
 
-        result = self.db.execute_query(query, (user_id,))
+        result = self.db.execute_prepared('user_profile', (user_id,))
 
         if result:
             row = result[0]
-            return {
+            profile = {
                 'user_id': row[0],
                 'customer_name': row[1],
                 'email': row[2],
@@ -98,17 +223,50 @@ class UserAPI:
                 'city': row[4],
                 'state': row[5],
                 'country': row[6],
-                'registration_date': row[7].strftime('%Y-%m-%d') if row[7] else None,
-                'preferences': json.loads(row[8]) if row[8] else {},
+                'registration_date': row[7].isoformat() if row[7] else None,
+                # JSONB arrives already decoded by psycopg2
+                'preferences': row[8] or {},
                 'order_summary': {
                     'total_orders': row[9] or 0,
                     'total_spent': float(row[10]) if row[10] else 0.0,
-                    'last_order_date': row[11].strftime('%Y-%m-%d') if row[11] else None
+                    'last_order_date': row[11].date().isoformat() if row[11] else None
                 }
             }
+            _profile_cache.set(user_id, copy.deepcopy(profile))
+            return profile
 
         return None
 
+    def _get_profile_fields(self, user_id: int, fields: Set[str]) -> Optional[Dict[str, Any]]:
+        columns = [column for field, column in _PROFILE_COLUMNS.items() if field in fields]
+        with_summary = 'order_summary' in fields
+        if with_summary:
+            columns += ['cos.total_orders', 'cos.total_spent', 'cos.last_order_date']
+
+        query = f"SELECT {', '.join(columns) or 'c.customer_id'} FROM customers c"
+        if with_summary:
+            query += f" LEFT JOIN LATERAL ({_PROFILE_SUMMARY_SQL}) cos ON true"
+        query += " WHERE c.customer_id = %s"
+
+        result = self.db.execute_query(query, (user_id,))
+        if not result:
+            return None
+
+        values = iter(result[0])
+        profile = {field: next(values) for field in _PROFILE_COLUMNS if field in fields}
+        if 'registration_date' in profile and profile['registration_date']:
+            profile['registration_date'] = profile['registration_date'].isoformat()
+        if 'preferences' in profile:
+            profile['preferences'] = profile['preferences'] or {}
+        if with_summary:
+            total_orders, total_spent, last_order_date = values
+            profile['order_summary'] = {
+                'total_orders': total_orders or 0,
+                'total_spent': float(total_spent) if total_spent else 0.0,
+                'last_order_date': last_order_date.date().isoformat() if last_order_date else None
+            }
+        return profile
+
     def update_user_preferences(self, user_id: int, preferences: Dict[str, Any]) -> bool:
         """Update user preferences using JSON operations."""
         # First check if user exists
@@ -125,7 +283,8 @@ class UserAPI:
         """
 
         try:
-            result = self.db.execute_query(update_query, (json.dumps(preferences), user_id))
+            result = self.db.execute_query(update_query, (_response_encoder.encode(preferences), user_id))
+            invalidate_profile_cache(user_id)
             return result is not None
 
         except psycopg2.Error:
@@ -135,11 +294,13 @@ class UserAPI:
 class OrderAPI:
     def __init__(self, db: Database):
         self.db = db
+        self._validate_new_order = make_validator(('customer_id', 'items'))
+        self.db.prepare('order_header', _ORDER_HEADER_SQL, ('int',))
+        self.db.prepare('order_items', _ORDER_ITEMS_SQL, ('int',))
 
     def create_order(self, order_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create order with inventory validation and transaction handling."""
-        required_fields = ['customer_id', 'items']
-        missing_fields = [field for field in required_fields if not order_data.get(field)]
+        missing_fields = self._validate_new_order(order_data)
 
         if missing_fields:
             return format_api_response(False, error=f"Missing required fields: {', '.join(missing_fields)}")
@@ -150,83 +311,88 @@ class OrderAPI:
         if not items:
             return format_api_response(False, error="Order must contain at least one item")
 
-        # Validate customer exists
-        customer_check = "SELECT customer_id FROM customers WHERE customer_id = %s"
-        if not self.db.execute_query(customer_check, (customer_id,)):
-            return format_api_response(False, error="Customer not found")
-
-        # Validate products and check inventory
         product_ids = [item['product_id'] for item in items]
-        product_query = """
-            SELECT product_id, product_name, price, stock_quantity
-            FROM products
-            WHERE product_id = ANY(%s)
-        """
-
-        products = self.db.execute_query(product_query, (product_ids,))
-
-        if len(products) != len(product_ids):
-            return format_api_response(False, error="One or more products not found")
-
-        # Create product lookup and validate inventory
-        product_lookup = {p[0]: {'name': p[1], 'price': p[2], 'stock': p[3]} for p in products}
-
-        inventory_errors = []
-        for item in items:
-            product_id = item['product_id']
-            quantity = item['quantity']
-
-            if quantity <= 0:
-                inventory_errors.append(f"Invalid quantity for product {product_id}")
-                continue
-
-            if product_id not in product_lookup:
-                inventory_errors.append(f"Product {product_id} not found")
-                continue
-
-            if product_lookup[product_id]['stock'] < quantity:
-                inventory_errors.append(f"Insufficient stock for product {product_id}")
-
-        if inventory_errors:
-            return format_api_response(False, error="; ".join(inventory_errors))
 
-        # Calculate totals
-        subtotal = sum(item['quantity'] * product_lookup[item['product_id']]['price'] for item in items)
-        tax_rate = 0.08  # 8% tax
-        tax_amount = subtotal * tax_rate
-        shipping_cost = 10.0 if subtotal < 100 else 0.0
-        total_amount = subtotal + tax_amount + shipping_cost
-
-        # Create order (transaction will be handled by the database trigger for stock updates)
+        # Lock the products, validate and insert in one transaction, so stock
+        # can't change between the check and the order_items insert
         try:
-            # Insert order
-            order_query = """
-                INSERT INTO orders (customer_id, total_amount, tax_amount, shipping_cost, status)
-                VALUES (%s, %s, %s, %s, 'confirmed')
-                RETURNING order_id
-            """
-
-            order_result = self.db.execute_query(order_query, (customer_id, total_amount, tax_amount, shipping_cost))
-
-            if not order_result:
-                return format_api_response(False, error="Failed to create order")
-
-            order_id = order_result[0][0]
-
-            # Insert order items
-            for item in items:
-                product_id = item['product_id']
-                quantity = item['quantity']
-                unit_price = product_lookup[product_id]['price']
-                total_price = quantity * unit_price
-
-                item_query = """
+            with self.db.transaction() as cursor:
+                # One round trip: customer existence plus the locked product rows
+                # (the LEFT JOIN keeps the customer flag when no product matches)
+                cursor.execute("""
+                    WITH locked_products AS (
+                        SELECT product_id, price, stock_quantity
+                        FROM products
+                        WHERE product_id = ANY(%s)
+                        FOR UPDATE
+                    )
+                    SELECT
+                        EXISTS (SELECT 1 FROM customers WHERE customer_id = %s),
+                        lp.product_id, lp.price, lp.stock_quantity
+                    FROM (SELECT 1) single_row
+                    LEFT JOIN locked_products lp ON true
+                """, (product_ids, customer_id))
+                rows = cursor.fetchall()
+
+                if not rows[0][0]:
+                    return format_api_response(False, error="Customer not found")
+
+                # Flat (price, stock) tuples per product rather than a dict per product
+                product_lookup = {row[1]: row[2:] for row in rows if row[1] is not None}
+
+                # Name the ids that matched no row (also correct when an id repeats)
+                missing_ids = set(product_ids).difference(product_lookup)
+                if missing_ids:
+                    missing = ', '.join(map(str, sorted(missing_ids)))
+                    return format_api_response(False, error=f"Products not found: {missing}")
+
+                # Validate inventory and price each line in the same pass; the
+                # line tuples feed both the subtotal and the item insert
+                inventory_errors = []
+                lines = []
+                for item in items:
+                    product_id = item['product_id']
+                    quantity = item['quantity']
+
+                    if quantity <= 0:
+                        inventory_errors.append(f"Invalid quantity for product {product_id}")
+                        continue
+
+                    price, stock = product_lookup[product_id]
+                    if stock < quantity:
+                        inventory_errors.append(f"Insufficient stock for product {product_id}")
+                        continue
+
+                    lines.append((product_id, quantity, price, quantity * price))
+
+                if inventory_errors:
+                    return format_api_response(False, error="; ".join(inventory_errors))
+
+                # Calculate totals
+                subtotal = sum(line[3] for line in lines)
+                tax_rate = 0.08  # 8% tax
+                tax_amount = subtotal * tax_rate
+                shipping_cost = 10.0 if subtotal < 100 else 0.0
+                total_amount = subtotal + tax_amount + shipping_cost
+
+                # Insert order
+                cursor.execute("""
+                    INSERT INTO orders (customer_id, total_amount, tax_amount, shipping_cost, status)
+                    VALUES (%s, %s, %s, %s, 'confirmed')
+                    RETURNING order_id
+                """, (customer_id, total_amount, tax_amount, shipping_cost))
+                order_id = cursor.fetchone()[0]
+
+                # Insert all order items in a single multi-row statement;
+                # the stock trigger decrements the rows locked above
+                execute_values(cursor, """
                     INSERT INTO order_items (order_id, product_id, quantity, unit_price, total_price)
-                    VALUES (%s, %s, %s, %s, %s)
-                """
-
-                self.db.execute_query(item_query, (order_id, product_id, quantity, unit_price, total_price))
+                    VALUES %s
+                """, [(order_id, *line) for line in lines])
 
+            invalidate_dashboard_cache()
+            invalidate_recommendation_cache(product_ids)
+            invalidate_profile_cache(customer_id)
             return format_api_response(True, data={
                 'order_id': order_id,
                 'total_amount': total_amount,
@@ -241,48 +407,20 @@ class OrderAPI:
 
     def get_order_status(self, order_id: int) -> Dict[str, Any]:
         """Get comprehensive order details."""
-        query = """
-            SELECT
-                o.order_id,
-                o.customer_id,
-                c.customer_name,
-                o.order_date,
-                o.status,
-                o.total_amount,
-                o.tax_amount,
-                o.shipping_cost,
-                o.notes
-            FROM orders o
-            JOIN customers c ON o.customer_id = c.customer_id
-            WHERE o.order_id = %s
-        """
-
-        order_result = self.db.execute_query(query, (order_id,))
+        order_result = self.db.execute_prepared('order_header', (order_id,))
 
         if not order_result:
             return format_api_response(False, error="Order not found")
 
         # Get order items
-        items_query = """
-            SELECT
-                oi.product_id,
-                p.product_name,
-                oi.quantity,
-                oi.unit_price,
-                oi.total_price
-            FROM order_items oi
-            JOIN products p ON oi.product_id = p.product_id
-            WHERE oi.order_id = %s
-        """
-
-        items_result = self.db.execute_query(items_query, (order_id,))
+        items_result = self.db.execute_prepared('order_items', (order_id,))
 
         order_row = order_result[0]
         return format_api_response(True, data={
             'order_id': order_row[0],
             'customer_id': order_row[1],
             'customer_name': order_row[2],
-            'order_date': order_row[3].strftime('%Y-%m-%d %H:%M:%S'),
+            'order_date': order_row[3].isoformat(sep=' ', timespec='seconds'),
             'status': order_row[4],
             'total_amount': float(order_row[5]),
             'tax_amount': float(order_row[6]),
@@ -303,13 +441,13 @@ class OrderAPI:
     def cancel_order(self, order_id: int, reason: str) -> Dict[str, Any]:
         """Cancel order with business rules validation."""
         # Check order exists and current status
-        status_query = "SELECT status FROM orders WHERE order_id = %s"
+        status_query = "SELECT status, customer_id FROM orders WHERE order_id = %s"
         status_result = self.db.execute_query(status_query, (order_id,))
 
         if not status_result:
             return format_api_response(False, error="Order not found")
 
-        current_status = status_result[0][0]
+        current_status, customer_id = status_result[0]
 
         if current_status in ['shipped', 'delivered', 'cancelled']:
             return format_api_response(False, error=f"Cannot cancel order with status: {current_status}")
@@ -329,6 +467,9 @@ class OrderAPI:
                 # Inventory will be restored by the database trigger when order_items are deleted
                 delete_items_query = "DELETE FROM order_items WHERE order_id = %s"
                 self.db.execute_query(delete_items_query, (order_id,))
+                invalidate_dashboard_cache()
+                invalidate_recommendation_cache()
+                invalidate_profile_cache(customer_id)
 
                 return format_api_response(True, data={
                     'order_id': order_id,
@@ -354,7 +495,8 @@ class OrderAPI:
                 o.total_amount
             FROM orders o
             JOIN customers c ON o.customer_id = c.customer_id
-            WHERE DATE(o.order_date) BETWEEN %s AND %s
+            WHERE o.order_date >= %s::date
+              AND o.order_date < %s::date + 1
         """
 
         params = [start_date, end_date]
@@ -365,22 +507,52 @@ class OrderAPI:
 
         base_query += " ORDER BY o.order_date DESC"
 
-        result = self.db.execute_query(base_query, params)
+        return [
+            {
+                'order_id': row[0],
+                'customer_id': row[1],
+                'customer_name': row[2],
+                'order_date': row[3].isoformat(sep=' ', timespec='seconds'),
+                'status': row[4],
+                'total_amount': float(row[5])
+            }
+            for row in self.db.iter_query(base_query, params)
+        ]
 
-        if result:
-            return [
-                {
-                    'order_id': row[0],
-                    'customer_id': row[1],
-                    'customer_name': row[2],
-                    'order_date': row[3].strftime('%Y-%m-%d %H:%M:%S'),
-                    'status': row[4],
-                    'total_amount': float(row[5])
-                }
-                for row in result
-            ]
+    def get_orders_with_items_by_date_range(self, start_date: str, end_date: str,
+                                            status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Orders in a date range with their line items, in two queries total."""
+        orders = self.get_orders_by_date_range(start_date, end_date, status)
+        if not orders:
+            return []
 
-        return []
+        # One items query for every order instead of one per order
+        items_query = """
+            SELECT
+                oi.order_id,
+                oi.product_id,
+                p.product_name,
+                oi.quantity,
+                oi.unit_price,
+                oi.total_price
+            FROM order_items oi
+            JOIN products p ON oi.product_id = p.product_id
+            WHERE oi.order_id = ANY(%s)
+        """
+
+        items_by_order = defaultdict(list)
+        for item in self.db.execute_query(items_query, ([o['order_id'] for o in orders],)) or []:
+            items_by_order[item[0]].append({
+                'product_id': item[1],
+                'product_name': item[2],
+                'quantity': item[3],
+                'unit_price': float(item[4]),
+                'total_price': float(item[5])
+            })
+
+        for order in orders:
+            order['items'] = items_by_order[order['order_id']]
+        return orders
 
 # Exercise 3: Product Search API (16 minutes)
 class ProductSearchAPI:
@@ -389,11 +561,94 @@ class ProductSearchAPI:
 
     def search_products(self, query: str, category: Optional[str] = None,
                        min_price: Optional[float] = None, max_price: Optional[float] = None,
-                       sort_by: str = 'relevance', page: int = 1, page_size: int = 20) -> Dict[str, Any]:
-        """Advanced product search with full-text search simulation."""
+                       sort_by: str = 'relevance', page_size: int = 20,
+                       after: Optional[str] = None, include_total: bool = False) -> Dict[str, Any]:
+        """Advanced product search using PostgreSQL full-text search.
+
+        Pass the previous response's pagination['next_cursor'] as `after` to
+        fetch the next page. Keyset pagination seeks straight to the page
+        boundary instead of scanning and discarding OFFSET rows. The total
+        match count means reading every match, so it is only computed on request.
+        """
 
-        # Base query with text search simulation
-        base_query = """
+        base_query, params, sort_expr, direction = self._build_search_query(
+            query, category, min_price, max_price, sort_by, include_total
+        )
+
+        if include_total:
+            # The window must see every match, so page over the counted set
+            # rather than letting the keyset condition shrink the count
+            base_query = f"SELECT * FROM ({base_query}) matches WHERE true"
+            key_expr, id_expr = 'sort_value', 'product_id'
+        else:
+            key_expr, id_expr = sort_expr, 'p.product_id'
+
+        # Keyset condition: continue strictly after the last row of the previous page
+        if after:
+            try:
+                cursor_key = decode_cursor(after)
+            except (ValueError, binascii.Error, json.JSONDecodeError, KeyError, TypeError):
+                # Not a token from paginate_results (garbled, truncated or forged)
+                return {'error': 'Invalid pagination cursor'}
+            comparison = '<' if direction == 'DESC' else '>'
+            base_query += f" AND ({key_expr}, {id_expr}) {comparison} (%s, %s)"
+            params.extend(cursor_key)
+
+        base_query += f" ORDER BY {key_expr} {direction}, {id_expr} {direction}"
+
+        # Fetch one extra row to learn whether another page exists
+        base_query += " LIMIT %s"
+        params.append(page_size + 1)
+
+        # Execute search
+        result = self.db.execute_query(base_query, params) or []
+        has_more = len(result) > page_size
+        result = result[:page_size]
+
+        products = [_search_result(row) for row in result]
+
+        # Generate pagination info from the last row's sort key
+        last_key = (result[-1][8], result[-1][0]) if result else None
+        pagination = paginate_results(last_key, page_size, has_more)
+
+        response = {
+            'products': products,
+            'pagination': pagination,
+            'search_query': query,
+            'filters': {
+                'category': category,
+                'min_price': min_price,
+                'max_price': max_price,
+                'sort_by': sort_by
+            }
+        }
+        if include_total:
+            response['total_count'] = result[0][9] if result else 0
+
+        return response
+
+    def _build_search_query(self, query: str, category: Optional[str], min_price: Optional[float],
+                            max_price: Optional[float], sort_by: str, include_total: bool = False):
+        """Build the filtered search SELECT shared by the paged and streaming paths."""
+        # search_tsv is a stored tsvector with a GIN index (see schema.sql). The
+        # query text is bound once, as q.tsq; plainto_tsquery treats %, _ and
+        # other punctuation as plain text, so user input needs no escaping.
+        relevance_expr = "ts_rank(p.search_tsv, q.tsq)"
+
+        # Sorting: (sort key expression, direction); product_id breaks ties
+        sort_options = {
+            'relevance': (relevance_expr, 'DESC'),
+            'price_asc': ('p.price', 'ASC'),
+            'price_desc': ('p.price', 'DESC'),
+            'rating': ('COALESCE(p.average_rating, 0)', 'DESC'),
+            'popularity': ('p.product_id', 'ASC')  # Simplified - could use sales data
+        }
+
+        sort_expr, direction = sort_options.get(sort_by, sort_options['relevance'])
+        total_column = ",\n                COUNT(*) OVER () as total_count" if include_total else ""
+
+        # Base query: GIN-indexed match, ranked with ts_rank
+        base_query = f"""
             SELECT
                 p.product_id,
                 p.product_name,
@@ -402,23 +657,17 @@ class ProductSearchAPI:
                 p.stock_quantity,
                 p.average_rating,
                 c.category_name,
-                -- Simple relevance scoring
-                CASE
-                    WHEN LOWER(p.product_name) LIKE LOWER(%s) THEN 3
-                    WHEN LOWER(p.description) LIKE LOWER(%s) THEN 2
-                    ELSE 1
-                END as relevance_score
+                {relevance_expr} as relevance_score,
+                {sort_expr} as sort_value{total_column}
             FROM products p
             JOIN categories c ON p.category_id = c.category_id
-            WHERE (
-                LOWER(p.product_name) LIKE LOWER(%s)
-                OR LOWER(p.description) LIKE LOWER(%s)
-            )
+            CROSS JOIN (SELECT plainto_tsquery('english', %s) AS tsq) q
+            WHERE p.search_tsv @@ q.tsq
         """
 
         # Build dynamic WHERE clauses
         where_conditions = []
-        params = [f'%{query}%', f'%{query}%', f'%{query}%', f'%{query}%']
+        params = [query]
 
         if category:
             where_conditions.append("c.category_name = %s")
@@ -435,129 +684,109 @@ class ProductSearchAPI:
         if where_conditions:
             base_query += " AND " + " AND ".join(where_conditions)
 
-        # Add sorting
-        sort_options = {
-            'relevance': 'relevance_score DESC, p.product_name',
-            'price_asc': 'p.price ASC',
-            'price_desc': 'p.price DESC',
-            'rating': 'p.average_rating DESC NULLS LAST',
-            'popularity': 'p.product_id ASC'  # Simplified - could use sales data
-        }
-
-        order_by = sort_options.get(sort_by, sort_options['relevance'])
-        base_query += f" ORDER BY {order_by}"
-
-        # Get total count for pagination
-        count_query = f"SELECT COUNT(*) FROM ({base_query}) as search_results"
-        count_result = self.db.execute_query(count_query, params)
-        total_count = count_result[0][0] if count_result else 0
-
-        # Add pagination
-        offset = (page - 1) * page_size
-        base_query += " LIMIT %s OFFSET %s"
-        params.extend([page_size, offset])
+        return base_query, params, sort_expr, direction
 
-        # Execute search
-        result = self.db.execute_query(base_query, params)
+    def iter_search_results(self, query: str, category: Optional[str] = None,
+                            min_price: Optional[float] = None, max_price: Optional[float] = None,
+                            sort_by: str = 'relevance') -> Iterator[Dict[str, Any]]:
+        """Stream every match in sort order, for exports too large for one page.
 
-        products = []
-        if result:
-            products = [
-                {
-                    'product_id': row[0],
-                    'product_name': row[1],
-                    'description': row[2],
-                    'price': float(row[3]),
-                    'stock_quantity': row[4],
-                    'average_rating': float(row[5]) if row[5] else None,
-                    'category': row[6],
-                    'relevance_score': row[7]
-                }
-                for row in result
-            ]
+        Rows come from a server-side cursor a chunk at a time; pair with
+        encode_json_lines() to send them as they are read.
+        """
+        base_query, params, sort_expr, direction = self._build_search_query(
+            query, category, min_price, max_price, sort_by
+        )
+        base_query += f" ORDER BY {sort_expr} {direction}, p.product_id {direction}"
 
-        # Generate pagination info
-        pagination = paginate_results(total_count, page, page_size)
-
-        return {
-            'products': products,
-            'total_count': total_count,
-            'pagination': pagination,
-            'search_query': query,
-            'filters': {
-                'category': category,
-                'min_price': min_price,
-                'max_price': max_price,
-                'sort_by': sort_by
-            }
-        }
+        for row in self.db.iter_query(base_query, params, chunk_size=256):
+            yield _search_result(row)
 
     def get_product_recommendations(self, product_id: int, limit: int = 5) -> List[Dict[str, Any]]:
         """Product recommendations using multiple strategies."""
+        cache_key = (product_id, limit)
+        cached = _recommendation_cache.get(cache_key)
+        if cached is not None:
+            # The dicts are flat, so copying each one keeps the cache intact
+            return [dict(recommendation) for recommendation in cached]
+
+        # Each strategy is a LATERAL branch with its own ORDER BY ... LIMIT, so it
+        # stops after `limit` index-ordered rows instead of materializing every
+        # candidate before the final sort
         query = """
             WITH target_product AS (
-                SELECT category_id, price
+                SELECT product_id, category_id, price
                 FROM products
                 WHERE product_id = %s
             ),
-            category_similar AS (
-                SELECT p.product_id, p.product_name, p.price, p.average_rating,
-                       1 as recommendation_type, 'Same category' as reason
-                FROM products p, target_product tp
-                WHERE p.category_id = tp.category_id
-                  AND p.product_id != %s
+            candidates AS (
+                SELECT r.*
+                FROM target_product tp
+                CROSS JOIN LATERAL (
+                    (SELECT p.product_id, p.product_name, p.price, p.average_rating,
+                            1 as recommendation_type, 'Same category' as reason
+                     FROM products p
+                     WHERE p.category_id = tp.category_id
+                       AND p.product_id != tp.product_id
+                     ORDER BY p.average_rating DESC NULLS LAST
+                     LIMIT %s)
+                    UNION ALL
+                    (SELECT p.product_id, p.product_name, p.price, p.average_rating,
+                            2 as recommendation_type, 'Similar price' as reason
+                     FROM products p
+                     WHERE p.price BETWEEN tp.price * 0.7 AND tp.price * 1.3
+                       AND p.category_id != tp.category_id
+                     ORDER BY p.average_rating DESC NULLS LAST
+                     LIMIT %s)
+                    UNION ALL
+                    (SELECT p.product_id, p.product_name, p.price, p.average_rating,
+                            3 as recommendation_type, 'Frequently bought together' as reason
+                     FROM products p
+                     WHERE p.product_id IN (
+                         SELECT oi2.product_id
+                         FROM order_items oi1
+                         JOIN order_items oi2 ON oi1.order_id = oi2.order_id
+                         WHERE oi1.product_id = tp.product_id
+                           AND oi2.product_id != tp.product_id
+                     )
+                     ORDER BY p.average_rating DESC NULLS LAST
+                     LIMIT %s)
+                ) r
             ),
-            price_similar AS (
-                SELECT p.product_id, p.product_name, p.price, p.average_rating,
-                       2 as recommendation_type, 'Similar price' as reason
-                FROM products p, target_product tp
-                WHERE ABS(p.price - tp.price) <= tp.price * 0.3
-                  AND p.product_id != %s
-                  AND p.category_id != tp.category_id
-            ),
-            frequently_bought AS (
-                SELECT p.product_id, p.product_name, p.price, p.average_rating,
-                       3 as recommendation_type, 'Frequently bought together' as reason
-                FROM products p
-                WHERE p.product_id IN (
-                    SELECT DISTINCT oi2.product_id
-                    FROM order_items oi1
-                    JOIN order_items oi2 ON oi1.order_id = oi2.order_id
-                    WHERE oi1.product_id = %s AND oi2.product_id != %s
-                )
+            deduped AS (
+                -- A product found by several strategies keeps its first reason
+                SELECT DISTINCT ON (product_id) *
+                FROM candidates
+                ORDER BY product_id, recommendation_type
             )
-            SELECT DISTINCT product_id, product_name, price, average_rating, reason
-            FROM (
-                SELECT * FROM category_similar
-                UNION ALL
-                SELECT * FROM price_similar
-                UNION ALL
-                SELECT * FROM frequently_bought
-            ) recommendations
+            SELECT product_id, product_name, price, average_rating, reason
+            FROM deduped
             ORDER BY recommendation_type, average_rating DESC NULLS LAST
             LIMIT %s
         """
 
-        result = self.db.execute_query(query, (product_id, product_id, product_id, product_id, product_id, limit))
+        result = self.db.execute_query(query, (product_id, limit, limit, limit, limit))
 
-        if result:
-            return [
-                {
-                    'product_id': row[0],
-                    'product_name': row[1],
-                    'price': float(row[2]),
-                    'average_rating': float(row[3]) if row[3] else None,
-                    'recommendation_reason': row[4]
-                }
-                for row in result
-            ]
+        if result is None:
+            return []
 
-        return []
+        recommendations = [
+            {
+                'product_id': row[0],
+                'product_name': row[1],
+                'price': float(row[2]),
+                'average_rating': float(row[3]) if row[3] else None,
+                'recommendation_reason': row[4]
+            }
+            for row in result
+        ]
+        _recommendation_cache.set(cache_key, [dict(recommendation) for recommendation in recommendations])
+        return recommendations
 
     def update_product_inventory(self, updates: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Bulk inventory update with validation."""
+        """Bulk inventory update with validation, applied in one statement."""
         results = []
-        successful_updates = 0
+        valid_updates = []
 
         for update in updates:
             product_id = update.get('product_id')
@@ -579,47 +808,46 @@ class ProductSearchAPI:
                 })
                 continue
 
-            try:
-                # Check if product exists
-                check_query = "SELECT product_id FROM products WHERE product_id = %s"
-                if not self.db.execute_query(check_query, (product_id,)):
-                    results.append({
-                        'product_id': product_id,
-                        'success': False,
-                        'error': 'Product not found'
-                    })
-                    continue
-
-                # Update inventory
-                update_query = """
-                    UPDATE products
-                    SET stock_quantity = %s,
-                        last_updated = CURRENT_TIMESTAMP
-                    WHERE product_id = %s
-                """
-
-                result = self.db.execute_query(update_query, (quantity, product_id))
-
-                if result is not None:
-                    results.append({
+            # Placeholder, filled in once the batched update returns
+            results.append(None)
+            valid_updates.append((len(results) - 1, product_id, quantity))
+
+        if valid_updates:
+            # Single UPDATE ... FROM (VALUES ...) instead of a check + update per row
+            update_query = """
+                UPDATE products
+                SET stock_quantity = v.quantity,
+                    last_updated = CURRENT_TIMESTAMP
+                FROM (VALUES %s) AS v(product_id, quantity)
+                WHERE products.product_id = v.product_id
+                RETURNING products.product_id
+            """
+
+            updated = self.db.execute_many(
+                update_query,
+                [(product_id, quantity) for _, product_id, quantity in valid_updates],
+                template="(%s::int, %s::int)"
+            )
+            # Any product_id missing from RETURNING did not match a product
+            updated_ids = {row[0] for row in updated} if updated is not None else set()
+
+            for index, product_id, quantity in valid_updates:
+                if product_id in updated_ids:
+                    results[index] = {
                         'product_id': product_id,
                         'success': True,
                         'new_quantity': quantity
-                    })
-                    successful_updates += 1
+                    }
                 else:
-                    results.append({
+                    results[index] = {
                         'product_id': product_id,
                         'success': False,
-                        'error': 'Update failed'
-                    })
+                        'error': 'Update failed' if updated is None else 'Product not found'
+                    }
 
-            except psycopg2.Error as e:
-                results.append({
-                    'product_id': product_id,
-                    'success': False,
-                    'error': f'Database error: {str(e)}'
-                })
+        successful_updates = sum(1 for r in results if r['success'])
+        if successful_updates:
+            invalidate_dashboard_cache()
 
         return {
             'total_updates': len(updates),
@@ -632,9 +860,15 @@ class ProductSearchAPI:
 class AnalyticsAPI:
     def __init__(self, db: Database):
         self.db = db
+        self.db.prepare('clv_customer', _CUSTOMER_CLV_SQL, ('int',))
+        self.db.prepare('clv_top', _CLV_SQL + " ORDER BY predicted_clv DESC LIMIT $1", ('int',))
 
     def get_dashboard_metrics(self, date_range: str = 'last_30_days') -> Dict[str, Any]:
         """Comprehensive dashboard with growth calculations."""
+        cached = _dashboard_cache.get(date_range)
+        if cached is not None:
+            # Callers get their own copy so edits can't leak into the cache
+            return copy.deepcopy(cached)
 
         # Date range calculation
         date_mappings = {
@@ -646,110 +880,74 @@ class AnalyticsAPI:
 
         days = date_mappings.get(date_range, 30)
 
+        # Sales and order totals come from the pre-aggregated daily views, so
+        # each period is a handful of rows. Distinct customers cannot be summed
+        # across days and are still counted from orders over the same window.
+        # Top products and cities are folded in as json_agg columns, so the
+        # whole dashboard is one round trip and one plan.
         query = """
-            WITH current_period AS (
+            WITH daily_totals AS (
                 SELECT
-                    SUM(total_amount) as current_sales,
-                    COUNT(DISTINCT order_id) as current_orders,
-                    COUNT(DISTINCT customer_id) as current_customers
-                FROM orders
-                WHERE order_date >= CURRENT_DATE - INTERVAL '%s days'
+                    SUM(revenue) FILTER (WHERE order_day >= CURRENT_DATE - make_interval(days => %s)) as current_sales,
+                    SUM(order_count) FILTER (WHERE order_day >= CURRENT_DATE - make_interval(days => %s)) as current_orders,
+                    SUM(revenue) FILTER (WHERE order_day < CURRENT_DATE - make_interval(days => %s)) as previous_sales,
+                    SUM(order_count) FILTER (WHERE order_day < CURRENT_DATE - make_interval(days => %s)) as previous_orders
+                FROM dashboard_metrics_daily
+                WHERE order_day >= CURRENT_DATE - make_interval(days => %s)
             ),
-            previous_period AS (
+            customer_totals AS (
                 SELECT
-                    SUM(total_amount) as previous_sales,
-                    COUNT(DISTINCT order_id) as previous_orders,
-                    COUNT(DISTINCT customer_id) as previous_customers
+                    COUNT(DISTINCT customer_id) FILTER (WHERE order_date >= CURRENT_DATE - make_interval(days => %s)) as current_customers,
+                    COUNT(DISTINCT customer_id) FILTER (WHERE order_date < CURRENT_DATE - make_interval(days => %s)) as previous_customers
                 FROM orders
-                WHERE order_date >= CURRENT_DATE - INTERVAL '%s days'
-                  AND order_date < CURRENT_DATE - INTERVAL '%s days'
+                WHERE order_date >= CURRENT_DATE - make_interval(days => %s)
             ),
             top_products AS (
-                SELECT
-                    p.product_name,
-                    SUM(oi.total_price) as revenue
-                FROM orders o
-                JOIN order_items oi ON o.order_id = oi.order_id
-                JOIN products p ON oi.product_id = p.product_id
-                WHERE o.order_date >= CURRENT_DATE - INTERVAL '%s days'
+                SELECT p.product_name, SUM(d.revenue) as revenue
+                FROM dashboard_product_revenue_daily d
+                JOIN products p ON d.product_id = p.product_id
+                WHERE d.order_day >= CURRENT_DATE - make_interval(days => %s)
                 GROUP BY p.product_id, p.product_name
                 ORDER BY revenue DESC
                 LIMIT 5
             ),
-            top_categories AS (
-                SELECT
-                    c.category_name,
-                    SUM(oi.total_price) as revenue
-                FROM orders o
-                JOIN order_items oi ON o.order_id = oi.order_id
-                JOIN products p ON oi.product_id = p.product_id
-                JOIN categories c ON p.category_id = c.category_id
-                WHERE o.order_date >= CURRENT_DATE - INTERVAL '%s days'
-                GROUP BY c.category_id, c.category_name
-                ORDER BY revenue DESC
-                LIMIT 5
-            ),
             geographic_data AS (
-                SELECT
-                    c.city,
-                    SUM(o.total_amount) as revenue,
-                    COUNT(DISTINCT o.order_id) as orders
-                FROM orders o
-                JOIN customers c ON o.customer_id = c.customer_id
-                WHERE o.order_date >= CURRENT_DATE - INTERVAL '%s days'
-                  AND c.city IS NOT NULL
-                GROUP BY c.city
+                SELECT city, SUM(revenue) as revenue, SUM(order_count)::int as orders
+                FROM dashboard_city_revenue_daily
+                WHERE order_day >= CURRENT_DATE - make_interval(days => %s)
+                GROUP BY city
                 ORDER BY revenue DESC
                 LIMIT 10
             )
             SELECT
-                cp.current_sales,
-                cp.current_orders,
-                cp.current_customers,
-                pp.previous_sales,
-                pp.previous_orders,
-                pp.previous_customers
-            FROM current_period cp, previous_period pp
+                dt.current_sales,
+                dt.current_orders,
+                ct.current_customers,
+                dt.previous_sales,
+                dt.previous_orders,
+                ct.previous_customers,
+                (SELECT COALESCE(json_agg(json_build_object(
+                            'product_name', product_name, 'revenue', revenue
+                        ) ORDER BY revenue DESC), '[]')
+                 FROM top_products) as top_products,
+                (SELECT COALESCE(json_agg(json_build_object(
+                            'city', city, 'revenue', revenue, 'orders', orders
+                        ) ORDER BY revenue DESC), '[]')
+                 FROM geographic_data) as geographic_distribution
+            FROM daily_totals dt, customer_totals ct
         """
 
-        # Execute main metrics query
-        main_result = self.db.execute_query(query, (days, days * 2, days, days, days, days))
-
-        # Get top products
-        top_products_query = """
-            SELECT p.product_name, SUM(oi.total_price) as revenue
-            FROM orders o
-            JOIN order_items oi ON o.order_id = oi.order_id
-            JOIN products p ON oi.product_id = p.product_id
-            WHERE o.order_date >= CURRENT_DATE - INTERVAL '%s days'
-            GROUP BY p.product_id, p.product_name
-            ORDER BY revenue DESC
-            LIMIT 5
-        """
-
-        top_products = self.db.execute_query(top_products_query, (days,))
-
-        # Get geographic distribution
-        geo_query = """
-            SELECT c.city, SUM(o.total_amount) as revenue, COUNT(DISTINCT o.order_id) as orders
-            FROM orders o
-            JOIN customers c ON o.customer_id = c.customer_id
-            WHERE o.order_date >= CURRENT_DATE - INTERVAL '%s days'
-              AND c.city IS NOT NULL
-            GROUP BY c.city
-            ORDER BY revenue DESC
-            LIMIT 10
-        """
-
-        geo_data = self.db.execute_query(geo_query, (days,))
+        main_result = self.db.execute_query(
+            query, (days, days, days, days, days * 2, days, days, days * 2, days, days)
+        )
 
         if main_result:
             row = main_result[0]
             current_sales = float(row[0]) if row[0] else 0
-            current_orders = row[1] or 0
+            current_orders = int(row[1] or 0)
             current_customers = row[2] or 0
             previous_sales = float(row[3]) if row[3] else 0
-            previous_orders = row[4] or 0
+            previous_orders = int(row[4] or 0)
             previous_customers = row[5] or 0
 
             # Calculate growth rates
@@ -757,7 +955,7 @@ class AnalyticsAPI:
             orders_growth = ((current_orders - previous_orders) / previous_orders * 100) if previous_orders > 0 else 0
             customers_growth = ((current_customers - previous_customers) / previous_customers * 100) if previous_customers > 0 else 0
 
-            return {
+            metrics = {
                 'date_range': date_range,
                 'metrics': {
                     'total_sales': current_sales,
@@ -770,74 +968,23 @@ class AnalyticsAPI:
                     'orders_growth': round(orders_growth, 2),
                     'customers_growth': round(customers_growth, 2)
                 },
-                'top_products': [
-                    {'product_name': row[0], 'revenue': float(row[1])}
-                    for row in top_products
-                ] if top_products else [],
-                'geographic_distribution': [
-                    {'city': row[0], 'revenue': float(row[1]), 'orders': row[2]}
-                    for row in geo_data
-                ] if geo_data else []
+                # psycopg2 decodes json columns into lists of dicts
+                'top_products': row[6],
+                'geographic_distribution': row[7]
             }
+            _dashboard_cache.set(date_range, copy.deepcopy(metrics))
+            return metrics
 
         return {}
 
     def get_customer_lifetime_value(self, customer_id: Optional[int] = None) -> List[Dict[str, Any]]:
         """Calculate CLV with predictive component."""
-        base_query = """
-            WITH customer_metrics AS (
-                SELECT
-                    c.customer_id,
-                    c.customer_name,
-                    c.registration_date,
-                    COALESCE(SUM(o.total_amount), 0) as total_spent,
-                    COUNT(o.order_id) as total_orders,
-                    COALESCE(AVG(o.total_amount), 0) as avg_order_value,
-                    MAX(o.order_date) as last_order_date,
-                    MIN(o.order_date) as first_order_date
-                FROM customers c
-                LEFT JOIN orders o ON c.customer_id = o.customer_id
-                GROUP BY c.customer_id, c.customer_name, c.registration_date
-            ),
-            customer_clv AS (
-                SELECT
-                    *,
-                    CASE
-                        WHEN total_orders = 0 THEN 0
-                        WHEN first_order_date IS NULL THEN 0
-                        ELSE
-                            -- Simple CLV prediction: avg_order_value * predicted_orders_per_year * 2 years
-                            avg_order_value *
-                            (total_orders / GREATEST(EXTRACT(DAYS FROM (COALESCE(last_order_date, CURRENT_DATE) - first_order_date)) / 365.0, 0.1)) *
-                            2
-                    END as predicted_clv,
-                    CASE
-                        WHEN total_orders = 0 THEN 0
-                        WHEN first_order_date IS NULL THEN 0
-                        ELSE total_orders / GREATEST(EXTRACT(DAYS FROM (COALESCE(last_order_date, CURRENT_DATE) - first_order_date)) / 365.0, 0.1)
-                    END as order_frequency_per_year
-                FROM customer_metrics
-            )
-            SELECT
-                customer_id,
-                customer_name,
-                total_spent,
-                total_orders,
-                avg_order_value,
-                order_frequency_per_year,
-                predicted_clv,
-                last_order_date
-            FROM customer_clv
-        """
-
-        params = []
+        # A single customer is computed live; the top-100 ranking is an index
+        # scan on customer_order_summary's predicted_clv
         if customer_id:
-            base_query += " WHERE customer_id = %s"
-            params.append(customer_id)
-
-        base_query += " ORDER BY predicted_clv DESC LIMIT 100"
-
-        result = self.db.execute_query(base_query, params)
+            result = self.db.execute_prepared('clv_customer', (customer_id,))
+        else:
+            result = self.db.execute_prepared('clv_top', (100,))
 
         if result:
             return [
@@ -849,13 +996,31 @@ class AnalyticsAPI:
                     'avg_order_value': float(row[4]),
                     'order_frequency_per_year': round(float(row[5]), 2),
                     'predicted_clv': round(float(row[6]), 2),
-                    'last_order_date': row[7].strftime('%Y-%m-%d') if row[7] else None
+                    'last_order_date': row[7].date().isoformat() if row[7] else None
                 }
                 for row in result
             ]
 
         return []
 
+    def get_summary_staleness(self) -> Dict[str, Any]:
+        """How long ago customer_order_summary (behind CLV) was refreshed."""
+        query = """
+            SELECT refreshed_at, EXTRACT(EPOCH FROM (CURRENT_TIMESTAMP - refreshed_at))
+            FROM materialized_view_refreshes
+            WHERE view_name = 'customer_order_summary'
+        """
+
+        result = self.db.execute_query(query)
+        if not result:
+            return {'refreshed_at': None, 'staleness_seconds': None}
+
+        refreshed_at, staleness = result[0]
+        return {
+            'refreshed_at': refreshed_at.isoformat(sep=' ', timespec='seconds'),
+            'staleness_seconds': round(float(staleness), 1)
+        }
+
     def generate_sales_report(self, report_type: str, start_date: str, end_date: str) -> Dict[str, Any]:
         """Flexible reporting system."""
         if report_type == 'summary':
@@ -868,10 +1033,11 @@ class AnalyticsAPI:
                     MIN(total_amount) as min_order_value,
                     MAX(total_amount) as max_order_value
                 FROM orders
-                WHERE DATE(order_date) BETWEEN %s AND %s
+                -- Half-open range on the raw column keeps idx_orders_date_cust usable
+                WHERE order_date >= %s::date AND order_date < %s::date + INTERVAL '1 day'
             """
 
-            result = self.db.execute_query(query, (start_date, end_date))
+            result = self.db.execute_cached(query, (start_date, end_date))
 
             if result:
                 row = result[0]
@@ -889,66 +1055,158 @@ class AnalyticsAPI:
                 }
 
         elif report_type == 'detailed':
-            query = """
-                SELECT
-                    o.order_id,
-                    o.order_date,
-                    c.customer_name,
-                    o.total_amount,
-                    o.status,
-                    COUNT(oi.order_item_id) as item_count
-                FROM orders o
-                JOIN customers c ON o.customer_id = c.customer_id
-                LEFT JOIN order_items oi ON o.order_id = oi.order_id
-                WHERE DATE(o.order_date) BETWEEN %s AND %s
-                GROUP BY o.order_id, o.order_date, c.customer_name, o.total_amount, o.status
-                ORDER BY o.order_date DESC
-                LIMIT 1000
-            """
-
-            result = self.db.execute_query(query, (start_date, end_date))
+            orders = list(self.iter_detailed_report(start_date, end_date, limit=1000))
 
-            if result:
+            if orders:
                 return {
                     'report_type': 'detailed',
                     'period': f"{start_date} to {end_date}",
-                    'orders': [
-                        {
-                            'order_id': row[0],
-                            'order_date': row[1].strftime('%Y-%m-%d %H:%M:%S'),
-                            'customer_name': row[2],
-                            'total_amount': float(row[3]),
-                            'status': row[4],
-                            'item_count': row[5]
-                        }
-                        for row in result
-                    ]
+                    'orders': orders
                 }
 
         return {'error': 'Invalid report type or no data found'}
 
+    def iter_detailed_report(self, start_date: str, end_date: str,
+                             limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Stream the detailed report's orders, newest first.
+
+        Rows come through a server-side cursor, so memory stays flat however
+        many orders the period holds; pair with encode_json_lines() to send
+        them as they arrive.
+        """
+        query = """
+            SELECT
+                o.order_id,
+                o.order_date,
+                c.customer_name,
+                o.total_amount,
+                o.status,
+                COUNT(oi.order_item_id) as item_count
+            FROM orders o
+            JOIN customers c ON o.customer_id = c.customer_id
+            LEFT JOIN order_items oi ON o.order_id = oi.order_id
+            WHERE o.order_date >= %s::date AND o.order_date < %s::date + INTERVAL '1 day'
+            GROUP BY o.order_id, o.order_date, c.customer_name, o.total_amount, o.status
+            ORDER BY o.order_date DESC
+        """
+        params = [start_date, end_date]
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+
+        for row in self.db.iter_query(query, params, chunk_size=200):
+            yield {
+                'order_id': row[0],
+                'order_date': row[1].isoformat(sep=' ', timespec='seconds'),
+                'customer_name': row[2],
+                'total_amount': float(row[3]),
+                'status': row[4],
+                'item_count': row[5]
+            }
+
 # Utility Functions
+def _search_result(row: Tuple) -> Dict[str, Any]:
+    """Shape one search row (see ProductSearchAPI._build_search_query)."""
+    return {
+        'product_id': row[0],
+        'product_name': row[1],
+        'description': row[2],
+        'price': float(row[3]),
+        'stock_quantity': row[4],
+        'average_rating': float(row[5]) if row[5] else None,
+        'category': row[6],
+        'relevance_score': row[7]
+    }
+
+@lru_cache(maxsize=128)
+def make_validator(required_fields: Tuple[str, ...]) -> Callable[[Dict[str, Any]], List[str]]:
+    """Build (and cache) a validator for one set of required fields."""
+    def validate(data: Dict[str, Any]) -> List[str]:
+        return [field for field in required_fields if not data.get(field)]
+    return validate
+
 def validate_input(data: Dict[str, Any], required_fields: List[str]) -> List[str]:
     """Return list of missing required fields."""
-    return [field for field in required_fields if not data.get(field)]
+    return make_validator(tuple(required_fields))(data)
 
-def paginate_results(total_count: int, page: int, page_size: int) -> Dict[str, Any]:
-    """Return pagination metadata."""
-    total_pages = (total_count + page_size - 1) // page_size
-    has_next = page < total_pages
-    has_prev = page > 1
+def paginate_results(last_key: Optional[Tuple[Any, int]], page_size: int, has_more: bool) -> Dict[str, Any]:
+    """Return keyset pagination metadata with an opaque next-page cursor."""
+    next_cursor = None
+    if has_more and last_key is not None:
+        sort_value, row_id = last_key
+        # default=str keeps Decimal/date sort keys exact; Postgres casts them back
+        payload = json.dumps({'v': sort_value, 'id': row_id}, default=str)
+        next_cursor = base64.urlsafe_b64encode(payload.encode()).decode()
 
     return {
-        'current_page': page,
         'page_size': page_size,
-        'total_pages': total_pages,
-        'total_count': total_count,
-        'has_next': has_next,
-        'has_prev': has_prev,
-        'next_page': page + 1 if has_next else None,
-        'prev_page': page - 1 if has_prev else None
+        'has_more': has_more,
+        'next_cursor': next_cursor
     }
 
+def decode_cursor(cursor: str) -> Tuple[Any, int]:
+    """Turn a cursor from paginate_results back into (sort_value, id)."""
+    payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return payload['v'], payload['id']
+
+def invalidate_dashboard_cache() -> None:
+    """Drop cached dashboard metrics after orders or inventory change."""
+    _dashboard_cache.clear()
+
+def invalidate_recommendation_cache(product_ids: Optional[Iterable[int]] = None) -> None:
+    """Drop cached recommendations for the given products, or all of them."""
+    if product_ids is None:
+        _recommendation_cache.clear()
+        return
+
+    product_ids = set(product_ids)
+    for key in _recommendation_cache.keys():
+        if key[0] in product_ids:
+            _recommendation_cache.pop(key)
+
+def invalidate_profile_cache(user_id: int) -> None:
+    """Drop a cached user profile after the user or their orders change."""
+    _profile_cache.pop(user_id)
+
+def _json_default(value: Any) -> Any:
+    """Serialize the non-JSON types our handlers return (dates, Decimals, dataclasses)."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if is_dataclass(value):
+        return asdict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+# Built once: json.dumps() with custom options constructs a new encoder on every call.
+# Shared by response bodies and JSONB parameters so both get the compact form.
+_response_encoder = json.JSONEncoder(separators=(',', ':'), default=_json_default)
+
+def encode_api_response(response: Dict[str, Any]) -> bytes:
+    """Encode a format_api_response() dict as a compact UTF-8 JSON body."""
+    return _response_encoder.encode(response).encode('utf-8')
+
+def encode_json_lines(records: Iterable[Any]) -> Iterator[bytes]:
+    """Encode records as newline-delimited compact JSON, one frame per record.
+
+    Suitable as the body of a chunked/streaming HTTP response, so clients can
+    start parsing before the last row has been read from the database.
+    """
+    for record in records:
+        yield _response_encoder.encode(record).encode('utf-8') + b'\n'
+
+def decode_json_lines(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """Client-side counterpart of encode_json_lines; chunks may split frames."""
+    buffer = b''
+    for chunk in chunks:
+        buffer += chunk
+        *frames, buffer = buffer.split(b'\n')
+        for frame in frames:
+            if frame:
+                yield json.loads(frame)
+    if buffer.strip():
+        yield json.loads(buffer)
+
 def format_api_response(success: bool, data: Any = None, error: str = None) -> Dict[str, Any]:
     """Standardize API response format."""
     response = {
@@ -4,69 +4,68 @@ These demonstrate advanced SQL techniques and efficient Python processing
 """
 
 from src.database import Database
-from typing import List, Dict, Any
-import json
-from datetime import datetime, timedelta
+from typing import List, Dict, Any, Tuple
+from dataclasses import dataclass
+import statistics
+from bisect import bisect_right
+from itertools import accumulate
+from datetime import date
+
+# NUMERIC columns already arrive as float (DEC2FLOAT in src/database.py),
+# so row values are used as-is rather than coerced with float() per cell
+
+@dataclass(slots=True)
+class CustomerRow:
+    """Fixed-layout result row; use dataclasses.asdict() when a dict is needed."""
+    customer_name: str
+    total_spent: float
+    order_count: int
+
+# PREPAREd once per connection; $1 is months_back, bound once for both uses
+_RETENTION_RATE_SQL = """
+    WITH customer_activity AS (
+        SELECT
+            customer_id,
+            BOOL_OR(order_date < CURRENT_DATE - make_interval(months => $1)) as bought_months_back,
+            BOOL_OR(order_date >= CURRENT_DATE - make_interval(months => 1)) as bought_recently
+        FROM orders
+        WHERE order_date >= CURRENT_DATE - make_interval(months => $1 + 1)
+        GROUP BY customer_id
+    )
+    SELECT
+        COUNT(*) FILTER (WHERE bought_months_back) as total_past_customers,
+        COUNT(*) FILTER (WHERE bought_months_back AND bought_recently) as retained_customers
+    FROM customer_activity
+"""
 
 # Exercise 1: Customer Analytics (15 minutes)
 class CustomerAnalytics:
     def __init__(self, db: Database):
         self.db = db
+        self.db.prepare('retention_rate', _RETENTION_RATE_SQL, ('int',))
 
-    def get_top_customers(self, limit: int = 10) -> List[Dict[str, Any]]:
+    def get_top_customers(self, limit: int = 10) -> List[CustomerRow]:
         """Find top customers by total purchase amount."""
+        # Read from the pre-aggregated summary instead of re-joining orders
         query = """
             SELECT
-                c.customer_name,
-                COALESCE(SUM(o.total_amount), 0) as total_spent,
-                COUNT(o.order_id) as order_count
-            FROM customers c
-            LEFT JOIN orders o ON c.customer_id = o.customer_id
-            GROUP BY c.customer_id, c.customer_name
+                customer_name,
+                total_spent,
+                total_orders as order_count
+            FROM customer_order_summary
             ORDER BY total_spent DESC
             LIMIT %s
         """
 
-        rows = self.db.execute_query(query, (limit,))
+        rows = self.db.execute_cached(query, (limit,))
 
         if rows:
-            return [
-                {
-                    'customer_name': row[0],
-                    'total_spent': float(row[1]),
-                    'order_count': row[2]
-                }
-                for row in rows
-            ]
+            return [CustomerRow(row[0], row[1], row[2]) for row in rows]
         return []
 
     def customer_retention_rate(self, months_back: int = 6) -> float:
-        """Calculate retention rate using intersection approach."""
-        query = """
-            WITH customers_months_back AS (
-                SELECT DISTINCT customer_id
-                FROM orders
-                WHERE order_date >= CURRENT_DATE - INTERVAL '%s months' - INTERVAL '1 month'
-                    AND order_date < CURRENT_DATE - INTERVAL '%s months'
-            ),
-            customers_recent AS (
-                SELECT DISTINCT customer_id
-                FROM orders
-                WHERE order_date >= CURRENT_DATE - INTERVAL '1 month'
-            ),
-            retention_data AS (
-                SELECT
-                    (SELECT COUNT(*) FROM customers_months_back) as total_past_customers,
-                    (SELECT COUNT(*)
-                     FROM customers_months_back cmb
-                     INNER JOIN customers_recent cr ON cmb.customer_id = cr.customer_id
-                    ) AS retained_customers
-            )
-            SELECT total_past_customers, retained_customers
-            FROM retention_data
-        """
-
-        result = self.db.execute_query(query, (months_back, months_back))
+        """Calculate retention rate in a single pass over orders."""
+        result = self.db.execute_prepared('retention_rate', (months_back,))
 
         if result and result[0][0] > 0:
             total_past, retained = result[0]
@@ -74,40 +73,24 @@ class CustomerAnalytics:
         return 0.0
 
     def segment_customers(self) -> Dict[str, List[str]]:
-        """Advanced customer segmentation using CTEs and UNION ALL."""
+        """Customer segmentation in a single pass over customer_order_summary."""
+        # Each customer row yields an array of matching segment labels,
+        # which UNNEST flattens into (segment, customer_name) pairs
         query = """
-            WITH frequent_customer AS (
-                SELECT customer_name
-                FROM customers c
-                JOIN orders o ON c.customer_id = o.customer_id
-                WHERE o.order_date >= CURRENT_DATE - INTERVAL '6 months'
-                GROUP BY c.customer_id, c.customer_name
-                HAVING COUNT(o.order_id) > 5
-            ),
-            big_spender AS (
-                SELECT customer_name
-                FROM customer_order_summary
-                WHERE total_orders > 0
-                    AND (total_spent / total_orders) > 200
-            ),
-            at_risk AS (
-                SELECT customer_name
-                FROM customer_order_summary
-                WHERE total_orders > 0
-                    AND last_order_date < CURRENT_DATE - INTERVAL '3 months'
-            ),
-            new AS (
-                SELECT customer_name
+            SELECT segment, customer_name
+            FROM (
+                SELECT
+                    customer_name,
+                    ARRAY_REMOVE(ARRAY[
+                        CASE WHEN orders_last_6_months > 5 THEN 'frequent' END,
+                        -- avg_order_value is stored in the view (0 when there are no orders)
+                        CASE WHEN avg_order_value > 200 THEN 'big_spender' END,
+                        CASE WHEN total_orders > 0
+                              AND last_order_date < CURRENT_DATE - INTERVAL '3 months' THEN 'at_risk' END,
+                        CASE WHEN first_order_date > CURRENT_DATE - INTERVAL '1 month' THEN 'new' END
+                    ], NULL) as segments
                 FROM customer_order_summary
-                WHERE first_order_date > CURRENT_DATE - INTERVAL '1 month'
-            )
-            SELECT 'frequent' as segment, customer_name FROM frequent_customer
-            UNION ALL
-            SELECT 'big_spender' as segment, customer_name FROM big_spender
-            UNION ALL
-            SELECT 'at_risk' as segment, customer_name FROM at_risk
-            UNION ALL
-            SELECT 'new' as segment, customer_name FROM new
+            ) labelled, UNNEST(segments) as segment
         """
 
         customer_segments = {'frequent': [], 'big_spender': [], 'at_risk': [], 'new': []}
@@ -134,7 +117,8 @@ class SalesAnalytics:
                     COUNT(order_id) as order_count,
                     AVG(total_amount) as avg_order_value
                 FROM orders
-                WHERE EXTRACT(YEAR FROM order_date) = %s
+                -- Half-open range on the raw column so idx_orders_date_cust can be used
+                WHERE order_date >= %s AND order_date < %s
                 GROUP BY EXTRACT(MONTH FROM order_date)
                 ORDER BY month
             ),
@@ -160,16 +144,16 @@ class SalesAnalytics:
             ORDER BY month
         """
 
-        rows = self.db.execute_query(query, (year,))
+        rows = self.db.execute_cached(query, (date(year, 1, 1), date(year + 1, 1, 1)))
 
         if rows:
             return [
                 {
                     'month': int(row[0]),
-                    'revenue': float(row[1]),
+                    'revenue': row[1],
                     'order_count': row[2],
-                    'avg_order_value': float(row[3]),
-                    'growth_rate': float(row[4]) if row[4] else 0.0
+                    'avg_order_value': row[3],
+                    'growth_rate': row[4] or 0.0
                 }
                 for row in rows
             ]
@@ -191,16 +175,16 @@ class SalesAnalytics:
             ORDER BY total_revenue DESC
         """
 
-        rows = self.db.execute_query(query)
+        rows = self.db.execute_cached(query)
 
         if rows:
             return [
                 {
                     'product_name': row[0],
                     'category': row[1],
-                    'total_revenue': float(row[2]),
+                    'total_revenue': row[2],
                     'units_sold': int(row[3]),
-                    'avg_rating': float(row[4]) if row[4] else None
+                    'avg_rating': row[4] or None
                 }
                 for row in rows
             ]
@@ -208,43 +192,32 @@ class SalesAnalytics:
 
     def detect_anomalies(self) -> List[Dict[str, Any]]:
         """Statistical anomaly detection using standard deviation."""
+        # SQL only aggregates; the z-score pass runs once over the daily series
         query = """
-            WITH daily_sales AS (
-                SELECT
-                    DATE(order_date) as sale_date,
-                    SUM(total_amount) as daily_revenue
-                FROM orders
-                WHERE order_date >= CURRENT_DATE - INTERVAL '90 days'
-                GROUP BY DATE(order_date)
-            ),
-            stats AS (
-                SELECT
-                    AVG(daily_revenue) as mean_revenue,
-                    STDDEV(daily_revenue) as stddev_revenue
-                FROM daily_sales
-            )
             SELECT
-                ds.sale_date,
-                ds.daily_revenue,
-                st.mean_revenue,
-                ABS(ds.daily_revenue - st.mean_revenue) / st.stddev_revenue as z_score
-            FROM daily_sales ds, stats st
-            WHERE ABS(ds.daily_revenue - st.mean_revenue) / st.stddev_revenue > 2
-            ORDER BY z_score DESC
+                DATE(order_date) as sale_date,
+                SUM(total_amount) as daily_revenue
+            FROM orders
+            WHERE order_date >= CURRENT_DATE - INTERVAL '90 days'
+            GROUP BY DATE(order_date)
+            ORDER BY sale_date
         """
 
         rows = self.db.execute_query(query)
 
         if rows:
+            revenues = [row[1] for row in rows]
+            mean_revenue, outliers = zscore_outliers(revenues, 2.0)
+            outliers.sort(key=lambda outlier: outlier[1], reverse=True)
             return [
                 {
-                    'date': row[0].strftime('%Y-%m-%d'),
-                    'daily_revenue': float(row[1]),
-                    'mean_revenue': float(row[2]),
-                    'z_score': float(row[3]),
-                    'anomaly_type': 'spike' if row[1] > row[2] else 'drop'
+                    'date': rows[i][0].isoformat(),
+                    'daily_revenue': revenues[i],
+                    'mean_revenue': mean_revenue,
+                    'z_score': z_score,
+                    'anomaly_type': 'spike' if revenues[i] > mean_revenue else 'drop'
                 }
-                for row in rows
+                for i, z_score in outliers
             ]
         return []
 
@@ -256,31 +229,26 @@ class InventoryOptimizer:
     def reorder_recommendations(self) -> List[Dict[str, Any]]:
         """Calculate reorder points using sales velocity."""
         query = """
-            WITH sales_velocity AS (
+            WITH sales30 AS (
                 SELECT
-                    p.product_id,
-                    p.product_name,
-                    p.stock_quantity,
-                    COALESCE(AVG(oi.quantity), 0) as avg_daily_sales
-                FROM products p
-                LEFT JOIN order_items oi ON p.product_id = oi.product_id
-                LEFT JOIN orders o ON oi.order_id = o.order_id
+                    oi.product_id,
+                    SUM(oi.quantity) / 30.0 as avg_daily_sales
+                FROM order_items oi
+                JOIN orders o ON oi.order_id = o.order_id
                 WHERE o.order_date >= CURRENT_DATE - INTERVAL '30 days'
-                GROUP BY p.product_id, p.product_name, p.stock_quantity
+                GROUP BY oi.product_id
             )
             SELECT
-                product_id,
-                product_name,
-                stock_quantity,
-                avg_daily_sales,
-                CASE
-                    WHEN avg_daily_sales > 0 THEN stock_quantity / avg_daily_sales
-                    ELSE 999
-                END as days_until_stockout
-            FROM sales_velocity
+                p.product_id,
+                p.product_name,
+                p.stock_quantity,
+                s.avg_daily_sales,
+                p.stock_quantity / s.avg_daily_sales as days_until_stockout
+            FROM products p
+            JOIN sales30 s ON p.product_id = s.product_id
             WHERE
-                avg_daily_sales > 0
-                AND stock_quantity / avg_daily_sales <= 7
+                s.avg_daily_sales > 0
+                AND p.stock_quantity / s.avg_daily_sales <= 7
             ORDER BY days_until_stockout ASC
         """
 
@@ -292,8 +260,8 @@ class InventoryOptimizer:
                     'product_id': row[0],
                     'product_name': row[1],
                     'current_stock': row[2],
-                    'avg_daily_sales': float(row[3]),
-                    'days_until_stockout': float(row[4]),
+                    'avg_daily_sales': row[3],
+                    'days_until_stockout': row[4],
                     'recommended_order_qty': int(row[3] * 30)  # 30 days supply
                 }
                 for row in rows
@@ -303,59 +271,49 @@ class InventoryOptimizer:
     def abc_analysis(self) -> Dict[str, List[Dict[str, Any]]]:
         """Pareto analysis with running totals."""
         query = """
-            WITH product_revenue AS (
-                SELECT
-                    p.product_id,
-                    p.product_name,
-                    c.category_name,
-                    COALESCE(SUM(oi.total_price), 0) as total_revenue
-                FROM products p
-                JOIN categories c ON p.category_id = c.category_id
-                LEFT JOIN order_items oi ON p.product_id = oi.product_id
-                GROUP BY p.product_id, p.product_name, c.category_name
-            ),
-            with_percentiles AS (
-                SELECT
-                    *,
-                    SUM(total_revenue) OVER() as total_all_revenue,
-                    SUM(total_revenue) OVER(ORDER BY total_revenue DESC) as running_revenue
-                FROM product_revenue
-                WHERE total_revenue > 0
-                ORDER BY total_revenue DESC
-            ),
-            classified AS (
-                SELECT
-                    *,
-                    (running_revenue / total_all_revenue) * 100 as cumulative_percent,
-                    CASE
-                        WHEN (running_revenue / total_all_revenue) * 100 <= 80 THEN 'A'
-                        WHEN (running_revenue / total_all_revenue) * 100 <= 95 THEN 'B'
-                        ELSE 'C'
-                    END as abc_class
-                FROM with_percentiles
-            )
-            SELECT abc_class, product_name, category_name, total_revenue, cumulative_percent
-            FROM classified
+            SELECT
+                p.product_name,
+                c.category_name,
+                SUM(oi.total_price) as total_revenue
+            FROM products p
+            JOIN categories c ON p.category_id = c.category_id
+            JOIN order_items oi ON p.product_id = oi.product_id
+            GROUP BY p.product_id, p.product_name, c.category_name
+            HAVING SUM(oi.total_price) > 0
             ORDER BY total_revenue DESC
         """
 
-        rows = self.db.execute_query(query)
+        rows = self.db.execute_cached(query)
         result = {'A': [], 'B': [], 'C': []}
 
         if rows:
-            for row in rows:
-                abc_class = row[0]
-                result[abc_class].append({
-                    'product_name': row[1],
-                    'category': row[2],
-                    'total_revenue': float(row[3]),
-                    'cumulative_percent': float(row[4])
-                })
+            revenues = [row[2] for row in rows]
+            total_revenue = sum(revenues)
+            cumulative_percents = [
+                running / total_revenue * 100 for running in accumulate(revenues)
+            ]
+
+            # Cumulative share is monotonic, so two binary searches find the class boundaries
+            a_end = bisect_right(cumulative_percents, 80)
+            b_end = bisect_right(cumulative_percents, 95, lo=a_end)
+
+            for abc_class, start, end in (('A', 0, a_end), ('B', a_end, b_end), ('C', b_end, len(rows))):
+                result[abc_class] = [
+                    {
+                        'product_name': rows[i][0],
+                        'category': rows[i][1],
+                        'total_revenue': revenues[i],
+                        'cumulative_percent': cumulative_percents[i]
+                    }
+                    for i in range(start, end)
+                ]
 
         return result
 
     def slow_moving_products(self, days: int = 90) -> List[Dict[str, Any]]:
         """Find products with inventory but no recent sales."""
+        # last_sold_at is maintained by a trigger on order_items, so this is a
+        # single-table scan of the partial index on in-stock products
         query = """
             SELECT
                 p.product_id,
@@ -364,138 +322,111 @@ class InventoryOptimizer:
                 p.stock_quantity,
                 p.price,
                 p.stock_quantity * p.price as inventory_value,
-                MAX(o.order_date) as last_sale_date
+                p.last_sold_at as last_sale_date,
+                CURRENT_DATE - p.last_sold_at as days_since_sale
             FROM products p
             JOIN categories c ON p.category_id = c.category_id
-            LEFT JOIN order_items oi ON p.product_id = oi.product_id
-            LEFT JOIN orders o ON oi.order_id = o.order_id
             WHERE p.stock_quantity > 0
-            GROUP BY p.product_id, p.product_name, c.category_name, p.stock_quantity, p.price
-            HAVING
-                MAX(o.order_date) IS NULL
-                OR MAX(o.order_date) < CURRENT_DATE - INTERVAL '%s days'
+              AND (
+                  p.last_sold_at IS NULL
+                  OR p.last_sold_at < CURRENT_DATE - make_interval(days => %s)
+              )
             ORDER BY inventory_value DESC
         """
 
-        rows = self.db.execute_query(query, (days,))
-
-        if rows:
-            return [
-                {
-                    'product_id': row[0],
-                    'product_name': row[1],
-                    'category': row[2],
-                    'stock_quantity': row[3],
-                    'unit_price': float(row[4]),
-                    'inventory_value': float(row[5]),
-                    'last_sale_date': row[6].strftime('%Y-%m-%d') if row[6] else None,
-                    'days_since_sale': (datetime.now().date() - row[6]).days if row[6] else None
-                }
-                for row in rows
-            ]
-        return []
+        return [
+            {
+                'product_id': row[0],
+                'product_name': row[1],
+                'category': row[2],
+                'stock_quantity': row[3],
+                'unit_price': row[4],
+                'inventory_value': row[5],
+                'last_sale_date': row[6].isoformat() if row[6] else None,
+                # date - date is an integer day count in Postgres (NULL if never sold)
+                'days_since_sale': row[7]
+            }
+            for row in self.db.iter_query(query, (days,))
+        ]
 
 # Exercise 4: Data Processing Pipeline (17 minutes)
 def process_daily_sales_report(db: Database, date: str) -> Dict[str, Any]:
     """Comprehensive daily report with multiple metrics."""
-
-    # Main metrics query
-    main_query = """
-        WITH daily_summary AS (
+    # `date` matches the exercise signature but shadows datetime.date here
+    report_date = date
+
+    # One statement: the day's orders are read once (half-open range on the raw
+    # order_date, so the date index is used) and every section is derived from
+    # that set; the two lists come back as json_agg columns
+    query = """
+        WITH day_orders AS MATERIALIZED (
             SELECT
-                COUNT(DISTINCT o.order_id) as total_orders,
-                COUNT(DISTINCT o.customer_id) as total_customers,
-                SUM(o.total_amount) as total_sales
+                o.order_id,
+                o.customer_id,
+                o.total_amount,
+                -- A customer is new if they have no order before the day
+                EXISTS (
+                    SELECT 1 FROM orders earlier
+                    WHERE earlier.customer_id = o.customer_id
+                      AND earlier.order_date < %(day)s::date
+                ) as has_prior
             FROM orders o
-            WHERE DATE(o.order_date) = %s
+            WHERE o.order_date >= %(day)s::date AND o.order_date < %(day)s::date + INTERVAL '1 day'
         ),
-        new_vs_returning AS (
-            SELECT
-                SUM(CASE
-                    WHEN first_order.first_date = %s THEN 1
-                    ELSE 0
-                END) as new_customers,
-                COUNT(*) - SUM(CASE
-                    WHEN first_order.first_date = %s THEN 1
-                    ELSE 0
-                END) as returning_customers
-            FROM orders o
-            JOIN (
-                SELECT customer_id, MIN(DATE(order_date)) as first_date
-                FROM orders
-                GROUP BY customer_id
-            ) first_order ON o.customer_id = first_order.customer_id
-            WHERE DATE(o.order_date) = %s
+        top_products AS (
+            SELECT p.product_name, SUM(oi.total_price) as revenue
+            FROM day_orders d
+            JOIN order_items oi ON d.order_id = oi.order_id
+            JOIN products p ON oi.product_id = p.product_id
+            GROUP BY p.product_id, p.product_name
+            ORDER BY revenue DESC
+            LIMIT 5
+        ),
+        geo AS (
+            SELECT c.city, COUNT(*) as orders, SUM(d.total_amount) as revenue
+            FROM day_orders d
+            JOIN customers c ON d.customer_id = c.customer_id
+            WHERE c.city IS NOT NULL
+            GROUP BY c.city
         )
         SELECT
-            ds.total_orders,
-            ds.total_customers,
-            ds.total_sales,
-            nvr.new_customers,
-            nvr.returning_customers
-        FROM daily_summary ds, new_vs_returning nvr
+            COUNT(*) as total_orders,
+            COUNT(DISTINCT customer_id) as total_customers,
+            SUM(total_amount) as total_sales,
+            COUNT(*) FILTER (WHERE NOT has_prior) as new_customers,
+            COUNT(*) FILTER (WHERE has_prior) as returning_customers,
+            (SELECT COALESCE(json_agg(json_build_object(
+                        'product_name', product_name, 'revenue', revenue
+                    ) ORDER BY revenue DESC), '[]')
+             FROM top_products) as top_products,
+            (SELECT COALESCE(json_agg(json_build_object(
+                        'city', city, 'orders', orders, 'revenue', revenue
+                    ) ORDER BY revenue DESC), '[]')
+             FROM geo) as geographic_breakdown
+        FROM day_orders
     """
 
-    # Top products query
-    top_products_query = """
-        SELECT
-            p.product_name,
-            SUM(oi.total_price) as revenue
-        FROM orders o
-        JOIN order_items oi ON o.order_id = oi.order_id
-        JOIN products p ON oi.product_id = p.product_id
-        WHERE DATE(o.order_date) = %s
-        GROUP BY p.product_id, p.product_name
-        ORDER BY revenue DESC
-        LIMIT 5
-    """
-
-    # Geographic breakdown query
-    geo_query = """
-        SELECT
-            c.city,
-            COUNT(DISTINCT o.order_id) as orders,
-            SUM(o.total_amount) as revenue
-        FROM orders o
-        JOIN customers c ON o.customer_id = c.customer_id
-        WHERE DATE(o.order_date) = %s AND c.city IS NOT NULL
-        GROUP BY c.city
-        ORDER BY revenue DESC
-    """
-
-    # Execute queries
-    main_result = db.execute_query(main_query, (date, date, date, date))
-    top_products = db.execute_query(top_products_query, (date,))
-    geo_breakdown = db.execute_query(geo_query, (date,))
+    result = db.execute_query(query, {'day': report_date})
 
     report = {
-        'date': date,
+        'date': report_date,
         'summary': {},
         'top_products': [],
         'geographic_breakdown': []
     }
 
-    if main_result:
-        row = main_result[0]
+    if result:
+        row = result[0]
         report['summary'] = {
             'total_orders': row[0] or 0,
             'total_customers': row[1] or 0,
-            'total_sales': float(row[2]) if row[2] else 0.0,
+            'total_sales': row[2] or 0.0,
             'new_customers': row[3] or 0,
             'returning_customers': row[4] or 0
         }
-
-    if top_products:
-        report['top_products'] = [
-            {'product_name': row[0], 'revenue': float(row[1])}
-            for row in top_products
-        ]
-
-    if geo_breakdown:
-        report['geographic_breakdown'] = [
-            {'city': row[0], 'orders': row[1], 'revenue': float(row[2])}
-            for row in geo_breakdown
-        ]
+        # psycopg2 decodes json columns into lists of dicts
+        report['top_products'] = row[5]
+        report['geographic_breakdown'] = row[6]
 
     return report
 
@@ -509,52 +440,63 @@ def data_quality_check(db: Database) -> Dict[str, List[str]]:
         'referential_integrity': []
     }
 
-    # Check for missing required data
-    missing_queries = [
-        ("SELECT COUNT(*) FROM customers WHERE customer_name IS NULL OR customer_name = ''", "customers with missing names"),
-        ("SELECT COUNT(*) FROM customers WHERE email IS NULL OR email = ''", "customers with missing emails"),
-        ("SELECT COUNT(*) FROM products WHERE product_name IS NULL OR price IS NULL", "products with missing critical data"),
-        ("SELECT COUNT(*) FROM orders WHERE customer_id IS NULL OR total_amount IS NULL", "orders with missing critical data")
-    ]
-
-    for query, description in missing_queries:
-        result = db.execute_query(query)
-        if result and result[0][0] > 0:
-            issues['missing_data'].append(f"{result[0][0]} {description}")
-
-    # Check for duplicates
-    duplicate_queries = [
-        ("SELECT email, COUNT(*) as cnt FROM customers GROUP BY email HAVING COUNT(*) > 1", "duplicate customer emails"),
-        ("SELECT customer_id, order_date, total_amount, COUNT(*) as cnt FROM orders GROUP BY customer_id, order_date, total_amount HAVING COUNT(*) > 1", "potential duplicate orders")
+    # Every check reduces to a count, so they all run as scalar subqueries of
+    # one SELECT: a single round trip instead of one per check.
+    # (issue category, description, count query)
+    checks = [
+        ('missing_data', "customers with missing names",
+         "SELECT COUNT(*) FROM customers WHERE customer_name IS NULL OR customer_name = ''"),
+        ('missing_data', "customers with missing emails",
+         "SELECT COUNT(*) FROM customers WHERE email IS NULL OR email = ''"),
+        ('missing_data', "products with missing critical data",
+         "SELECT COUNT(*) FROM products WHERE product_name IS NULL OR price IS NULL"),
+        ('missing_data', "orders with missing critical data",
+         "SELECT COUNT(*) FROM orders WHERE customer_id IS NULL OR total_amount IS NULL"),
+        # Duplicate checks count the duplicated groups
+        ('duplicates', "duplicate customer emails",
+         "SELECT COUNT(*) FROM (SELECT email FROM customers GROUP BY email HAVING COUNT(*) > 1) d"),
+        ('duplicates', "potential duplicate orders",
+         "SELECT COUNT(*) FROM (SELECT customer_id, order_date, total_amount FROM orders GROUP BY customer_id, order_date, total_amount HAVING COUNT(*) > 1) d"),
+        ('outliers', "products with extreme prices",
+         "SELECT COUNT(*) FROM products WHERE price < 0 OR price > 10000"),
+        ('outliers', "orders with extreme amounts",
+         "SELECT COUNT(*) FROM orders WHERE total_amount < 0 OR total_amount > 50000"),
+        ('outliers', "order items with extreme quantities",
+         "SELECT COUNT(*) FROM order_items WHERE quantity <= 0 OR quantity > 1000"),
+        ('referential_integrity', "orders with invalid customer_id",
+         "SELECT COUNT(*) FROM orders o LEFT JOIN customers c ON o.customer_id = c.customer_id WHERE c.customer_id IS NULL"),
+        ('referential_integrity', "order_items with invalid order_id",
+         "SELECT COUNT(*) FROM order_items oi LEFT JOIN orders o ON oi.order_id = o.order_id WHERE o.order_id IS NULL"),
+        ('referential_integrity', "order_items with invalid product_id",
+         "SELECT COUNT(*) FROM order_items oi LEFT JOIN products p ON oi.product_id = p.product_id WHERE p.product_id IS NULL")
     ]
 
-    for query, description in duplicate_queries:
-        result = db.execute_query(query)
-        if result:
-            issues['duplicates'].append(f"{len(result)} {description}")
+    query = "SELECT\n" + ",\n".join(f"    ({count_query})" for _, _, count_query in checks)
+    result = db.execute_cached(query)
 
-    # Check for outliers
-    outlier_queries = [
-        ("SELECT COUNT(*) FROM products WHERE price < 0 OR price > 10000", "products with extreme prices"),
-        ("SELECT COUNT(*) FROM orders WHERE total_amount < 0 OR total_amount > 50000", "orders with extreme amounts"),
-        ("SELECT COUNT(*) FROM order_items WHERE quantity <= 0 OR quantity > 1000", "order items with extreme quantities")
-    ]
+    if result:
+        for (category, description, _), count in zip(checks, result[0]):
+            if count > 0:
+                issues[category].append(f"{count} {description}")
 
-    for query, description in outlier_queries:
-        result = db.execute_query(query)
-        if result and result[0][0] > 0:
-            issues['outliers'].append(f"{result[0][0]} {description}")
+    return issues
 
-    # Check referential integrity
-    integrity_queries = [
-        ("SELECT COUNT(*) FROM orders o LEFT JOIN customers c ON o.customer_id = c.customer_id WHERE c.customer_id IS NULL", "orders with invalid customer_id"),
-        ("SELECT COUNT(*) FROM order_items oi LEFT JOIN orders o ON oi.order_id = o.order_id WHERE o.order_id IS NULL", "order_items with invalid order_id"),
-        ("SELECT COUNT(*) FROM order_items oi LEFT JOIN products p ON oi.product_id = p.product_id WHERE p.product_id IS NULL", "order_items with invalid product_id")
+def zscore_outliers(values: List[float], threshold: float) -> Tuple[float, List[Tuple[int, float]]]:
+    """
+    Single pass over a numeric series: return the mean and (index, |z|) for
+    every value more than `threshold` sample standard deviations from it.
+    """
+    if len(values) < 2:
+        return (values[0] if values else 0.0), []
+
+    mean = statistics.fmean(values)
+    stddev = statistics.stdev(values, mean)
+    if stddev == 0:
+        return mean, []
+
+    cutoff = threshold * stddev
+    return mean, [
+        (i, abs(value - mean) / stddev)
+        for i, value in enumerate(values)
+        if abs(value - mean) > cutoff
     ]
-
-    for query, description in integrity_queries:
-        result = db.execute_query(query)
-        if result and result[0][0] > 0:
-            issues['referential_integrity'].append(f"{result[0][0]} {description}")
-
-    return issues
\ No newline at end of file
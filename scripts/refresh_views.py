@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Materialized View Refresh Job
+Brings the precomputed report views up to date. Run it from cron, or pass
+--every SECONDS to keep it running as a background worker.
+"""
+
+import os
+import sys
+import time
+
+# Add src to path to import database module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import psycopg2
+from database import Database
+
+# Views this job keeps fresh, refreshed in this order
+VIEWS = (
+    'customer_order_summary',
+    'dashboard_metrics_daily',
+    'dashboard_product_revenue_daily',
+    'dashboard_city_revenue_daily',
+)
+
+def refresh_views(db: Database, views=VIEWS) -> bool:
+    """Refresh each view in its own transaction; True if every refresh succeeded."""
+    all_good = True
+    for view in views:
+        try:
+            # refresh_materialized_view() refreshes CONCURRENTLY, so readers keep
+            # the previous snapshot meanwhile, and records the refresh time
+            with db.transaction() as cursor:
+                cursor.execute("SELECT refresh_materialized_view(%s)", (view,))
+            print(f"✅ Refreshed {view}")
+        except psycopg2.Error as e:
+            print(f"❌ Failed to refresh {view}: {e}")
+            all_good = False
+    return all_good
+
+def main():
+    interval = None
+    if len(sys.argv) > 1:
+        if len(sys.argv) != 3 or sys.argv[1] != '--every':
+            print("Usage: python scripts/refresh_views.py [--every SECONDS]")
+            return 2
+        interval = float(sys.argv[2])
+
+    db = Database()
+    if not db.connect():
+        print("❌ Could not connect to database")
+        return 1
+
+    try:
+        if interval is None:
+            return 0 if refresh_views(db) else 1
+
+        while True:
+            started = time.monotonic()
+            refresh_views(db)
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -25,15 +25,15 @@ def main():
         if os.path.exists(exercise_path):
             if exercise_path.endswith('.py'):
                 result = runner.run_data_structure_tests(exercise_path)
-                status_emoji = "✅" if result['status'] == 'PASS' else "❌" if result['status'] == 'FAIL' else "⚠️"
-                print(f"{status_emoji} {os.path.basename(exercise_path)}: {result['message']}")
-                if result.get('output'):
+                status_emoji = "✅" if result.status == 'PASS' else "❌" if result.status == 'FAIL' else "⚠️"
+                print(f"{status_emoji} {os.path.basename(exercise_path)}: {result.message}")
+                if result.output:
                     print("\nOutput:")
-                    print(result['output'])
+                    print(result.output)
             elif exercise_path.endswith('.sql'):
                 result = runner.run_sql_tests(exercise_path)
-                status_emoji = "✅" if result['status'] == 'PASS' else "❌" if result['status'] == 'FAIL' else "ℹ️"
-                print(f"{status_emoji} {os.path.basename(exercise_path)}: {result['message']}")
+                status_emoji = "✅" if result.status == 'PASS' else "❌" if result.status == 'FAIL' else "ℹ️"
+                print(f"{status_emoji} {os.path.basename(exercise_path)}: {result.message}")
             else:
                 print("❌ Unsupported file type. Use .py or .sql files.")
         else:
@@ -5,8 +5,10 @@ One-command database initialization with schema and sample data
 """
 
 import os
+import re
 import sys
 import subprocess
+from functools import lru_cache
 from pathlib import Path
 
 # Add src to path to import database module
@@ -14,6 +16,33 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from database import Database
 
+@lru_cache(maxsize=1)
+def _psql_invocation():
+    """psql arguments and environment, built from the environment once."""
+    env = os.environ.copy()
+    db_password = env.get('DB_PASSWORD')
+    if db_password:
+        # Allow non-interactive auth if password is provided
+        env['PGPASSWORD'] = db_password
+
+    host = env.get('DB_HOST', 'localhost')
+    port = env.get('DB_PORT', '5432')
+    dbname = env.get('DB_NAME', 'interview_practice')
+    user = env.get('DB_USER')
+
+    cmd = [
+        'psql',
+        '-v', 'ON_ERROR_STOP=1',
+        '-h', host,
+        '-p', str(port),
+        '-d', dbname,
+    ]
+
+    if user:
+        cmd.extend(['-U', user])
+
+    return tuple(cmd), env
+
 def run_sql_file_psql(sql_file: str, description: str = "") -> bool:
     """
     Execute a SQL file using psql so that PL/pgSQL dollar-quoted blocks
@@ -22,31 +51,8 @@ def run_sql_file_psql(sql_file: str, description: str = "") -> bool:
     try:
         print(f"📄 {description or f'Running {os.path.basename(sql_file)}'}...", end=" ")
 
-        env = os.environ.copy()
-        db_password = env.get('DB_PASSWORD')
-        if db_password:
-            # Allow non-interactive auth if password is provided
-            env['PGPASSWORD'] = db_password
-
-        host = env.get('DB_HOST', 'localhost')
-        port = env.get('DB_PORT', '5432')
-        dbname = env.get('DB_NAME', 'interview_practice')
-        user = env.get('DB_USER')
-
-        cmd = [
-            'psql',
-            '-v', 'ON_ERROR_STOP=1',
-            '-h', host,
-            '-p', str(port),
-            '-d', dbname,
-        ]
-
-        if user:
-            cmd.extend(['-U', user])
-
-        cmd.extend(['-f', sql_file])
-
-        result = subprocess.run(cmd, capture_output=True, text=True, env=env)
+        cmd, env = _psql_invocation()
+        result = subprocess.run([*cmd, '-f', sql_file], capture_output=True, text=True, env=env)
         if result.returncode == 0:
             print("✅ Success")
             return True
@@ -60,6 +66,33 @@ def run_sql_file_psql(sql_file: str, description: str = "") -> bool:
         print(f"❌ Failed: {str(e)}")
         return False
 
+# psql meta-commands and statements that refuse to run inside a transaction block
+_PSQL_ONLY = re.compile(
+    r'^\s*(?:\\|VACUUM\b|CREATE\s+DATABASE\b|(?:CREATE|DROP)\s+INDEX\s+CONCURRENTLY\b)',
+    re.IGNORECASE | re.MULTILINE
+)
+
+def run_sql_file(db: Database, sql_file: str, description: str = "") -> bool:
+    """
+    Execute a SQL file over the application's connection in one transaction,
+    sparing a psql process launch and login. Files psycopg2 can't run that
+    way go through psql instead.
+    """
+    sql = Path(sql_file).read_text()
+    if _PSQL_ONLY.search(sql):
+        return run_sql_file_psql(sql_file, description)
+
+    try:
+        print(f"📄 {description or f'Running {os.path.basename(sql_file)}'}...", end=" ")
+        # A single execute sends the whole script, dollar-quoted bodies included
+        with db.transaction() as cursor:
+            cursor.execute(sql)
+        print("✅ Success")
+        return True
+    except Exception as e:
+        print(f"❌ Failed: {str(e)}")
+        return False
+
 def check_postgresql():
     """Check if PostgreSQL is installed and accessible"""
     try:
@@ -161,17 +194,6 @@ def main():
         return 1
     
     # Connect to database and run setup scripts
-    print("\n📊 Initializing database schema and data...")
-    # Use psql to run SQL scripts to properly handle PL/pgSQL blocks
-    schema_file = os.path.join('database', 'schema.sql')
-    if not run_sql_file_psql(schema_file, "Setting up database schema"):
-        return 1
-
-    data_file = os.path.join('database', 'sample_data.sql')
-    if not run_sql_file_psql(data_file, "Loading sample data"):
-        return 1
-
-    # Verify setup using application connection
     db = Database()
     if not db.connect():
         print("❌ Could not connect to database")
@@ -179,18 +201,28 @@ def main():
         return 1
 
     try:
+        print("\n📊 Initializing database schema and data...")
+        schema_file = os.path.join('database', 'schema.sql')
+        if not run_sql_file(db, schema_file, "Setting up database schema"):
+            return 1
+
+        data_file = os.path.join('database', 'sample_data.sql')
+        if not run_sql_file(db, data_file, "Loading sample data"):
+            return 1
+
         print("\n✅ Verifying database setup...")
         tables = ['customers', 'products', 'categories', 'orders', 'order_items']
         all_good = True
-        
-        for table in tables:
-            result = db.execute_query(f"SELECT COUNT(*) FROM {table}")
-            if result:
-                count = result[0][0]
+
+        # One round trip for every table's count
+        counts_query = "SELECT " + ", ".join(f"(SELECT COUNT(*) FROM {table})" for table in tables)
+        result = db.execute_query(counts_query)
+        if result:
+            for table, count in zip(tables, result[0]):
                 print(f"   📊 {table}: {count} records")
-            else:
-                print(f"   ❌ {table}: Error checking")
-                all_good = False
+        else:
+            print(f"   ❌ {', '.join(tables)}: Error checking")
+            all_good = False
         
         if all_good:
             print("\n🎉 Database setup completed successfully!")
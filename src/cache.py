@@ -0,0 +1,215 @@
+"""
+In-process TTL cache for expensive, read-heavy query results
+"""
+
+import re
+import select
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Mapping
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+import psycopg2
+
+from src.database import Database, connection_params
+
+
+# Safe to share across threads: every operation on the entries takes the lock
+class TTLCache:
+    def __init__(self, maxsize: int = 128, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                self._entries.pop(key, None)
+                return default
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.maxsize:
+                # Dicts keep insertion order, so the first key is the oldest entry
+                del self._entries[next(iter(self._entries))]
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def keys(self) -> List[Hashable]:
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        sentinel = object()
+        return self.get(key, sentinel) is not sentinel
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Tables a statement reads (FROM/JOIN) or writes (INSERT INTO/UPDATE/DELETE FROM).
+# Writes are matched anywhere, so DML inside a WITH clause counts too; the
+# lookahead skips ON CONFLICT ... DO UPDATE SET.
+_READ_TABLES = re.compile(r'\b(?:FROM|JOIN)\s+([a-z_][\w.]*)', re.IGNORECASE)
+_WRITE_TABLES = re.compile(r'\b(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+(?!SET\b)([a-z_][\w.]*)', re.IGNORECASE)
+
+
+def _params_key(params) -> Optional[Tuple]:
+    # Named (%(name)s) parameters come as a mapping; tuple() would keep only its keys
+    if params is None:
+        return None
+    if isinstance(params, Mapping):
+        return tuple(sorted(params.items()))
+    return tuple(params)
+
+
+# Keeps execute_cached() results until their TTL or a write to a table they read.
+# Writes through execute_query/execute_many invalidate automatically; writes made
+# inside transaction() should call invalidate_table() for the tables they touch.
+# listen_for_invalidations() also picks up writes from other processes, via the
+# table_changed NOTIFY triggers in schema.sql.
+class CachedDatabase(Database):
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 300):
+        super().__init__()
+        self._results = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._table_keys: Dict[str, Set[Hashable]] = defaultdict(set)
+        self._tables_by_query: Dict[str, Tuple[str, ...]] = {}
+        # Bumped by every invalidation and part of each key, so a read that was
+        # in flight during a write files its rows under a key no one looks up
+        self._table_versions: Dict[str, int] = defaultdict(int)
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Guards the cache against invalidations arriving on the listener thread
+        self._lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+        self._stop_listening = threading.Event()
+
+    def execute_cached(self, query: str, params=None):
+        tables = self._read_tables(query)
+        key = (query, _params_key(params), self.table_versions(tables))
+        try:
+            result = self._results.get(key)
+        except TypeError:
+            # Unhashable parameters (e.g. lists for ANY(%s)) are not cached
+            return self.execute_query(query, params)
+
+        if result is not None:
+            self.cache_hits += 1
+            # A new list per caller: mutating a result must not alter later hits
+            return list(result)
+
+        self.cache_misses += 1
+        result = super().execute_query(query, params)
+        if result is not None:
+            with self._lock:
+                self._results.set(key, list(result))
+                for table in tables:
+                    keys = self._table_keys[table]
+                    keys.add(key)
+                    if len(keys) > self._results.maxsize:
+                        # Drop keys whose results already expired or were evicted
+                        keys.intersection_update(self._results.keys())
+        return result
+
+    def execute_query(self, query: str, params=None):
+        result = super().execute_query(query, params)
+        self._invalidate_written(query)
+        return result
+
+    def execute_many(self, query: str, rows, *args, **kwargs):
+        result = super().execute_many(query, rows, *args, **kwargs)
+        self._invalidate_written(query)
+        return result
+
+    def table_versions(self, tables) -> Tuple[int, ...]:
+        # Changes whenever any of the tables is invalidated; other caches can
+        # key on it to be invalidated by the same writes
+        with self._lock:
+            return tuple(self._table_versions[table.lower()] for table in tables)
+
+    def invalidate_table(self, table: str) -> None:
+        table = table.lower()
+        with self._lock:
+            self._table_versions[table] += 1
+            for key in self._table_keys.pop(table, ()):
+                self._results.pop(key)
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            for table in self._table_versions:
+                self._table_versions[table] += 1
+            self._results.clear()
+            self._table_keys.clear()
+
+    def listen_for_invalidations(self, channel: str = 'table_changed', poll_interval: float = 1.0) -> None:
+        if self._listener is not None:
+            return
+        self._stop_listening.clear()
+        self._listener = threading.Thread(
+            target=self._listen, args=(channel, poll_interval), name='cache-invalidation', daemon=True
+        )
+        self._listener.start()
+
+    def stop_listening(self) -> None:
+        if self._listener is not None:
+            self._stop_listening.set()
+            self._listener.join()
+            self._listener = None
+
+    def _listen(self, channel: str, poll_interval: float) -> None:
+        # A dedicated autocommit connection: notifications are only delivered
+        # between transactions, and the query connection may sit inside one
+        try:
+            connection = psycopg2.connect(**connection_params())
+        except psycopg2.Error as e:
+            print(f"Error starting cache invalidation listener: {e}")
+            return
+
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {channel}")
+
+            while not self._stop_listening.is_set():
+                # Wait for the socket rather than polling the server
+                if select.select([connection], [], [], poll_interval) == ([], [], []):
+                    continue
+                connection.poll()
+                tables = {notify.payload for notify in connection.notifies}
+                connection.notifies.clear()
+                for table in tables:
+                    self.invalidate_table(table)
+        except psycopg2.Error as e:
+            # Without the listener only the TTL bounds staleness
+            print(f"Cache invalidation listener stopped: {e}")
+        finally:
+            connection.close()
+
+    def _read_tables(self, query: str) -> Tuple[str, ...]:
+        # Parsed once per distinct SQL text; CTE names are harmless extras
+        tables = self._tables_by_query.get(query)
+        if tables is None:
+            tables = tuple({name.lower() for name in _READ_TABLES.findall(query)})
+            self._tables_by_query[query] = tables
+        return tables
+
+    def _invalidate_written(self, query: str) -> None:
+        for table in set(_WRITE_TABLES.findall(query)):
+            self.invalidate_table(table)
@@ -1,23 +1,49 @@
+import itertools
 import os
+import threading
+from contextlib import contextmanager
 import psycopg2
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
 from dotenv import load_dotenv
-from typing import Optional
+from typing import Any, Dict, Optional, Set, Tuple
 
 load_dotenv()
 
+# Return NUMERIC columns as float rather than Decimal. The conversion runs in the
+# driver, so callers don't pay for Decimal construction plus a float() per cell;
+# float64 keeps cent precision for amounts far beyond anything stored here.
+DEC2FLOAT = psycopg2.extensions.new_type(
+    psycopg2.extensions.DECIMAL.values,
+    'DEC2FLOAT',
+    lambda value, cursor: float(value) if value is not None else None
+)
+psycopg2.extensions.register_type(DEC2FLOAT)
+
+def connection_params() -> Dict[str, Any]:
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': os.getenv('DB_PORT', '5432'),
+        'database': os.getenv('DB_NAME', 'interview_practice'),
+        'user': os.getenv('DB_USER'),
+        'password': os.getenv('DB_PASSWORD'),
+    }
+
 class Database:
     def __init__(self):
         self.connection: Optional[psycopg2.extensions.connection] = None
+        self._cursor_ids = itertools.count()
+        # Statements registered with prepare(), and those PREPAREd on the current connection
+        self._statements: Dict[str, Tuple[str, Tuple[str, ...]]] = {}
+        self._prepared: Set[str] = set()
         
     def connect(self):
+        # Reuse an open connection rather than paying for another handshake
+        if self.connection is not None and not self.connection.closed:
+            return self.connection
         try:
-            self.connection = psycopg2.connect(
-                host=os.getenv('DB_HOST', 'localhost'),
-                port=os.getenv('DB_PORT', '5432'),
-                database=os.getenv('DB_NAME', 'interview_practice'),
-                user=os.getenv('DB_USER'),
-                password=os.getenv('DB_PASSWORD')
-            )
+            self.connection = psycopg2.connect(**connection_params())
+            self._prepared.clear()
             return self.connection
         except psycopg2.Error as e:
             print(f"Error connecting to database: {e}")
@@ -41,4 +67,138 @@ class Database:
         except psycopg2.Error as e:
             self.connection.rollback()
             print(f"Error executing query: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def execute_cached(self, query: str, params=None):
+        # Read-only queries whose results may be reused; CachedDatabase caches them
+        return self.execute_query(query, params)
+
+    @contextmanager
+    def transaction(self):
+        if not self.connection:
+            self.connect()
+
+        # Everything run on the yielded cursor commits or rolls back together;
+        # errors propagate so the caller can decide how to report them
+        try:
+            with self.connection.cursor() as cursor:
+                yield cursor
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+
+    def iter_query(self, query: str, params=None, chunk_size: int = 10_000):
+        if not self.connection:
+            self.connect()
+
+        # Named cursors live server-side, so only chunk_size rows are held client-side at once
+        try:
+            with self.connection.cursor(name=f"iter_query_{next(self._cursor_ids)}") as cursor:
+                cursor.itersize = chunk_size
+                cursor.execute(query, params)
+                yield from cursor
+            self.connection.commit()
+        except psycopg2.Error as e:
+            self.connection.rollback()
+            print(f"Error streaming query: {e}")
+
+    def execute_many(self, query: str, rows, template=None, page_size: int = 1000,
+                     synchronous_commit: bool = True):
+        if not self.connection:
+            self.connect()
+
+        # Expands `VALUES %s` into one multi-row statement per page of rows
+        try:
+            with self.connection.cursor() as cursor:
+                if not synchronous_commit:
+                    # Don't wait for the WAL flush on commit; only for loads that can be re-run
+                    cursor.execute("SET LOCAL synchronous_commit = off")
+                returning = 'RETURNING' in query.upper()
+                result = execute_values(cursor, query, rows, template=template,
+                                        page_size=page_size, fetch=returning)
+                self.connection.commit()
+                return result if returning else cursor.rowcount
+        except psycopg2.Error as e:
+            self.connection.rollback()
+            print(f"Error executing batch: {e}")
+            return None
+
+    def bulk_insert(self, table: str, columns, rows, ignore_conflicts: bool = False,
+                    page_size: int = 1000):
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s"
+        if ignore_conflicts:
+            query += " ON CONFLICT DO NOTHING"
+        return self.execute_many(query, rows, page_size=page_size)
+
+    def prepare(self, name: str, query: str, param_types: Tuple[str, ...] = ()):
+        # Registered lazily: PREPARE runs on first use on each connection
+        if self._statements.get(name) != (query, param_types):
+            if name in self._prepared:
+                self.execute_query(f"DEALLOCATE {name}")
+                self._prepared.discard(name)
+            self._statements[name] = (query, param_types)
+
+    def execute_prepared(self, name: str, params=()):
+        if not self.connection:
+            self.connect()
+
+        if name not in self._prepared:
+            query, param_types = self._statements[name]
+            types = f" ({', '.join(param_types)})" if param_types else ""
+            if self.execute_query(f"PREPARE {name}{types} AS {query}") is None:
+                return None
+            self._prepared.add(name)
+
+        placeholders = f" ({', '.join(['%s'] * len(params))})" if params else ""
+        return self.execute_query(f"EXECUTE {name}{placeholders}", params)
+
+
+# A single Database serializes every caller on its one connection. The pool lets
+# concurrent requests each check out a connection (`with pool.session() as db:`)
+# and run in parallel up to maxconn; across many processes, front the server
+# with pgbouncer in transaction mode instead.
+class DatabasePool:
+    def __init__(self, minconn: int = 4, maxconn: int = 32):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self._pool: Optional[ThreadedConnectionPool] = None
+        self._lock = threading.Lock()
+        # Keyed by connection id so each connection keeps its Database, and with
+        # it the record of which statements are already PREPAREd there
+        self._sessions: Dict[int, Database] = {}
+
+    def _get_pool(self) -> ThreadedConnectionPool:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadedConnectionPool(self.minconn, self.maxconn, **connection_params())
+            return self._pool
+
+    @contextmanager
+    def session(self):
+        pool = self._get_pool()
+        connection = pool.getconn()
+        try:
+            with self._lock:
+                db = self._sessions.get(id(connection))
+                if db is None or db.connection is not connection:
+                    db = Database()
+                    db.connection = connection
+                    self._sessions[id(connection)] = db
+            yield db
+        finally:
+            broken = bool(connection.closed)
+            if broken:
+                with self._lock:
+                    self._sessions.pop(id(connection), None)
+            elif connection.status != psycopg2.extensions.STATUS_READY:
+                # Never hand the next caller a connection mid-transaction
+                connection.rollback()
+            pool.putconn(connection, close=broken)
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+            self._sessions.clear()
@@ -10,11 +10,15 @@ def find_missing_number(nums):
     
     Time: O(n), Space: O(1)
     """
+    # XOR every index 0..n with every value: matching pairs cancel, leaving
+    # the missing number. Unlike the sum formula, nothing grows past n's width.
+    from functools import reduce
+    from operator import xor
     n = len(nums)
-    # Sum of 0 to n is n*(n+1)/2
-    expected_sum = n * (n + 1) // 2
-    actual_sum = sum(nums)
-    return expected_sum - actual_sum
+    # XOR of 0..n repeats with period 4: n, 1, n + 1, 0
+    expected = (n, 1, n + 1, 0)[n % 4]
+    # reduce() with a C-level xor folds the values without per-element bytecode
+    return expected ^ reduce(xor, nums, 0)
 
 def two_sum(nums, target):
     """
@@ -25,9 +29,10 @@ def two_sum(nums, target):
     """
     seen = {}  # value -> index
     for i, num in enumerate(nums):
-        complement = target - num
-        if complement in seen:
-            return [seen[complement], i]
+        # One .get() hashes the complement once; `in` followed by [] hashes it twice
+        j = seen.get(target - num)
+        if j is not None:
+            return [j, i]
         seen[num] = i
     return []
 
@@ -57,12 +62,17 @@ def remove_duplicates(nums):
     if not nums:
         return 0
     
-    # Two pointers approach
+    # Two pointers approach: the read pointer is the iterator, and the last
+    # kept value stays in a local instead of being re-read by index. Writes
+    # only land at or behind the read position, so iterating in place is safe.
+    from itertools import islice
     write_index = 1
-    for read_index in range(1, len(nums)):
-        if nums[read_index] != nums[read_index - 1]:
-            nums[write_index] = nums[read_index]
+    prev = nums[0]
+    for value in islice(nums, 1, None):
+        if value != prev:
+            nums[write_index] = value
             write_index += 1
+            prev = value
     
     return write_index
 
@@ -3,16 +3,23 @@ Solutions to Hash Maps and Sets Exercises
 Try solving exercises/data_structures/hash_maps_and_sets.py first!
 """
 
+from collections import Counter, defaultdict
+from functools import lru_cache
+
 def first_uniq_char(s):
     """
     Find the first non-repeating character in a string and return its index.
     
     Time: O(n), Space: O(1) - at most 26 characters in English
     """
-    # Count frequency of each character
-    char_count = {}
-    for char in s:
-        char_count[char] = char_count.get(char, 0) + 1
+    if s.isascii():
+        # At most 128 distinct characters, each checked with one find/rfind
+        # pair in C; a character is unique when both land on the same index
+        unique = [i for c in set(s) if (i := s.find(c)) == s.rfind(c)]
+        return min(unique, default=-1)
+
+    # Count frequency of each character (Counter does the loop in C)
+    char_count = Counter(s)
     
     # Find first character with count 1
     for i, char in enumerate(s):
@@ -27,28 +34,20 @@ def is_anagram(s, t):
     
     Time: O(n), Space: O(1) - at most 26 characters
     """
-    if len(s) != len(t):
-        return False
-    
-    # Method 1: Sort and compare
+    # Method 1: Sort and compare - O(n log n)
     # return sorted(s) == sorted(t)
     
-    # Method 2: Count frequencies
-    char_count = {}
-    
-    # Count characters in s
-    for char in s:
-        char_count[char] = char_count.get(char, 0) + 1
+    if len(s) != len(t):
+        return False
     
-    # Subtract characters in t
-    for char in t:
-        if char not in char_count:
-            return False
-        char_count[char] -= 1
-        if char_count[char] == 0:
-            del char_count[char]
+    if s.isascii():
+        # At most 128 distinct characters: compare their counts with str.count
+        # scans in C, stopping at the first mismatch. Equal lengths mean t
+        # can't hold any character s lacks.
+        return all(s.count(c) == t.count(c) for c in set(s))
     
-    return len(char_count) == 0
+    # Method 2: Compare frequencies; counting and equality both run in C
+    return Counter(s) == Counter(t)
 
 def top_k_frequent(nums, k):
     """
@@ -56,25 +55,8 @@ def top_k_frequent(nums, k):
     
     Time: O(n log k), Space: O(n)
     """
-    from collections import Counter
-    import heapq
-    
-    # Count frequencies
-    count = Counter(nums)
-    
-    # Use heap to find top k
-    # Python's heapq is min-heap, so we use negative frequencies
-    heap = []
-    for num, freq in count.items():
-        heapq.heappush(heap, (-freq, num))
-    
-    # Extract top k elements
-    result = []
-    for _ in range(k):
-        freq, num = heapq.heappop(heap)
-        result.append(num)
-    
-    return result
+    # most_common(k) keeps only the k largest counts (heapq.nlargest)
+    return [num for num, _ in Counter(nums).most_common(k)]
 
 def intersection(nums1, nums2):
     """
@@ -82,10 +64,10 @@ def intersection(nums1, nums2):
     
     Time: O(m + n), Space: O(min(m, n))
     """
-    # Convert to sets and find intersection
-    set1 = set(nums1)
-    set2 = set(nums2)
-    return list(set1 & set2)
+    # Hash only the smaller array; intersection() streams the larger one
+    if len(nums1) > len(nums2):
+        nums1, nums2 = nums2, nums1
+    return list(set(nums1).intersection(nums2))
 
 def subarray_sum(nums, k):
     """
@@ -96,17 +78,18 @@ def subarray_sum(nums, k):
     # Use cumulative sum and hash map
     count = 0
     cumsum = 0
-    cumsum_count = {0: 1}  # cumsum -> frequency
+    cumsum_count = defaultdict(int)  # cumsum -> frequency
+    cumsum_count[0] = 1
     
     for num in nums:
         cumsum += num
         
-        # If (cumsum - k) exists, we found subarrays ending at current position
-        if (cumsum - k) in cumsum_count:
-            count += cumsum_count[cumsum - k]
+        # Each earlier cumsum equal to (cumsum - k) starts a subarray ending here
+        # (.get, not [], so misses don't insert zero entries)
+        count += cumsum_count.get(cumsum - k, 0)
         
         # Add current cumsum to map
-        cumsum_count[cumsum] = cumsum_count.get(cumsum, 0) + 1
+        cumsum_count[cumsum] += 1
     
     return count
 
@@ -118,6 +101,15 @@ def generate_sales_report():
     Time: O(p*d + o), Space: O(p*d)
     where p = products, d = dates, o = orders
     """
+    # The data is hardcoded, so the rows are computed once; each call gets
+    # fresh dicts, so callers can't alter what the next call returns
+    return [
+        {"date": date, "product_name": name, "product_id": product_id, "total_revenue": revenue}
+        for date, name, product_id, revenue in _sales_report_rows()
+    ]
+
+@lru_cache(maxsize=1)
+def _sales_report_rows():
     # Hardcoded data
     products = [
         {"id": 1, "name": "Laptop", "price": 999.99},
@@ -138,38 +130,28 @@ def generate_sales_report():
         # Note: No orders for Monitor (id=4) or Webcam (id=5)
     ]
 
-    # Group orders by date and product using hash map
-    sales_by_date_product = {}
+    # Price lookup by product id, built once instead of scanning per order
+    price_by_id = {p["id"]: p["price"] for p in products}
+
+    # Group orders by (date, product) using hash map - one probe per access
+    sales_by_date_product = defaultdict(float)
 
     for order in orders:
-        date = order["date"]
         product_id = order["product_id"]
+        sales_by_date_product[(order["date"], product_id)] += price_by_id[product_id]
 
-        if date not in sales_by_date_product:
-            sales_by_date_product[date] = {}
-
-        if product_id not in sales_by_date_product[date]:
-            sales_by_date_product[date][product_id] = 0
-
-        # Find product price and add to revenue
-        product_price = next(p["price"] for p in products if p["id"] == product_id)
-        sales_by_date_product[date][product_id] += product_price
-
-    # Generate report ensuring all products appear for each date
+    # Generate report ensuring all products appear for each date. Dates and
+    # products are visited in sorted order, so rows come out already sorted.
     report = []
     all_dates = sorted(set(order["date"] for order in orders))
+    products_by_name = sorted(products, key=lambda p: p["name"])
 
     for date in all_dates:
-        for product in products:
-            revenue = sales_by_date_product.get(date, {}).get(product["id"], 0)
-            report.append({
-                "date": date,
-                "product_name": product["name"],
-                "product_id": product["id"],
-                "total_revenue": revenue
-            })
-
-    return sorted(report, key=lambda x: (x["date"], x["product_name"]))
+        for product in products_by_name:
+            revenue = sales_by_date_product.get((date, product["id"]), 0)
+            report.append((date, product["name"], product["id"], revenue))
+
+    return tuple(report)
 
 # Test cases
 if __name__ == "__main__":
@@ -3,160 +3,232 @@ Test Runner for Interview Practice Exercises
 Validates your solutions and provides feedback
 """
 
+import contextlib
+import io
+import mmap
 import os
+import re
 import sys
-import importlib.util
-import traceback
-from typing import Dict, List, Any, Callable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from importlib.machinery import SourceFileLoader
+from pathlib import Path
+from traceback import TracebackException
+from dataclasses import dataclass, field, replace
+from types import CodeType
+from typing import Dict, FrozenSet, Optional, Tuple
 from database import Database
 
+# Marks an unfinished SQL exercise
+_TODO_MARKER = re.compile(rb"TODO:")
+
+# Outcome of one check. Slots keep it small and fixed-layout, and frozen keeps
+# results safe to share once returned (including from pool workers).
+@dataclass(slots=True, frozen=True)
+class TestResult:
+    __test__ = False  # not a pytest test class
+
+    status: str
+    message: str
+    output: str = ""
+    todos: int = 0
+    data_counts: Optional[Dict[str, int]] = None
+    # Formatted on demand via TestRunner.format_traceback
+    traceback: Optional[TracebackException] = field(default=None, repr=False)
+
 class TestRunner:
     def __init__(self):
         self.db = Database()
         self.results = []
+        # Compiled exercise files: path -> (mtime_ns, code)
+        self._code_cache: Dict[str, Tuple[int, CodeType]] = {}
+        # TODO counts of SQL exercises: path -> (mtime_ns, count)
+        self._sql_cache: Dict[str, Tuple[int, int]] = {}
+        # information_schema lookups that found every table: tables -> present names
+        self._tables_present: Dict[Tuple[str, ...], FrozenSet[str]] = {}
+        # stdout capture for exercise runs, cleared before each one
+        self._capture = io.StringIO()
+    
+    def _compile_exercise(self, exercise_file: str) -> CodeType:
+        """Compile an exercise file, reusing the code object until the file changes"""
+        mtime = os.stat(exercise_file).st_mtime_ns
+        cached = self._code_cache.get(exercise_file)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        
+        # The import machinery's loader reads and writes __pycache__, so even a
+        # fresh runner (or worker process) skips recompiling unchanged files
+        code = SourceFileLoader('__main__', exercise_file).get_code('__main__')
+        self._code_cache[exercise_file] = (mtime, code)
+        return code
     
-    def run_data_structure_tests(self, exercise_file: str) -> Dict[str, Any]:
+    def run_data_structure_tests(self, exercise_file: str) -> TestResult:
         """Run tests for data structure exercises"""
         try:
-            # Load the exercise module
-            spec = importlib.util.spec_from_file_location("exercise", exercise_file)
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
+            code = self._compile_exercise(exercise_file)
             
             # Run the test cases in the module
             print(f"\n🧪 Testing {os.path.basename(exercise_file)}...")
             
-            # Capture test output
-            import io
-            import contextlib
+            # Capture test output in the runner's reusable buffer
+            self._capture.seek(0)
+            self._capture.truncate()
+            with contextlib.redirect_stdout(self._capture):
+                # Execute once as __main__ so the file's test block runs
+                exec(code, {'__name__': '__main__', '__file__': exercise_file})
             
-            f = io.StringIO()
-            with contextlib.redirect_stdout(f):
-                # Execute the test section
-                if hasattr(module, '__name__'):
-                    # Run the if __name__ == "__main__" block
-                    exec(compile(open(exercise_file).read(), exercise_file, 'exec'))
-            
-            output = f.getvalue()
+            output = self._capture.getvalue()
             
             if "All tests passed!" in output:
-                return {"status": "PASS", "message": "All tests passed!", "output": output}
+                return TestResult("PASS", "All tests passed!", output=output)
             else:
-                return {"status": "FAIL", "message": "Some tests failed", "output": output}
+                return TestResult("FAIL", "Some tests failed", output=output)
                 
         except Exception as e:
-            return {"status": "ERROR", "message": f"Error running tests: {str(e)}", "traceback": traceback.format_exc()}
+            # Frames are captured now but source lines are only read if the
+            # traceback is formatted
+            return TestResult(
+                "ERROR",
+                f"Error running tests: {str(e)}",
+                traceback=TracebackException.from_exception(e, lookup_lines=False)
+            )
+    
+    @staticmethod
+    def format_traceback(result: TestResult) -> str:
+        """Render the traceback captured in an ERROR result"""
+        tb = result.traceback
+        return "".join(tb.format()) if tb is not None else ""
     
-    def run_sql_tests(self, sql_file: str, solution_file: str = None) -> Dict[str, Any]:
+    def _count_todos(self, sql_file: str) -> int:
+        """Count TODO markers in a file, reusing the last count until it changes"""
+        st = os.stat(sql_file)
+        cached = self._sql_cache.get(sql_file)
+        if cached and cached[0] == st.st_mtime_ns:
+            return cached[1]
+        
+        todo_count = 0
+        if st.st_size:  # mmap can't map an empty file
+            # Search the raw bytes for the ASCII marker: no decode, no str copy
+            with open(sql_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                todo_count = len(_TODO_MARKER.findall(mm))
+        self._sql_cache[sql_file] = (st.st_mtime_ns, todo_count)
+        return todo_count
+    
+    def run_sql_tests(self, sql_file: str, solution_file: str = None) -> TestResult:
         """Run tests for SQL exercises by comparing with solutions"""
         try:
             print(f"\n🗃️  Testing SQL queries in {os.path.basename(sql_file)}...")
             
             if not self.db.connect():
-                return {"status": "ERROR", "message": "Could not connect to database"}
-            
-            # Read the exercise file
-            with open(sql_file, 'r') as f:
-                content = f.read()
+                return TestResult("ERROR", "Could not connect to database")
             
             # Check if there are any TODO comments (indicating incomplete exercises)
-            if "TODO:" in content:
-                todo_count = content.count("TODO:")
-                return {
-                    "status": "INCOMPLETE", 
-                    "message": f"Found {todo_count} TODO items. Complete the exercises first!",
-                    "todos": todo_count
-                }
+            todo_count = self._count_todos(sql_file)
+            if todo_count:
+                return TestResult(
+                    "INCOMPLETE",
+                    f"Found {todo_count} TODO items. Complete the exercises first!",
+                    todos=todo_count
+                )
             
             # If solution file exists, we could compare results (advanced feature)
             if solution_file and os.path.exists(solution_file):
-                return {"status": "INFO", "message": "Exercise appears complete. Compare with solutions manually."}
+                return TestResult("INFO", "Exercise appears complete. Compare with solutions manually.")
             
-            return {"status": "INFO", "message": "SQL exercises ready for manual review."}
+            return TestResult("INFO", "SQL exercises ready for manual review.")
             
         except Exception as e:
-            return {"status": "ERROR", "message": f"Error checking SQL: {str(e)}"}
+            return TestResult("ERROR", f"Error checking SQL: {str(e)}")
+    
+    def _table_presence(self, tables: Tuple[str, ...]) -> FrozenSet[str]:
+        """Which of the given tables exist, looked up in the catalog once per runner"""
+        existing = self._tables_present.get(tables)
+        if existing is None:
+            result = self.db.execute_query(
+                "SELECT table_name FROM information_schema.tables WHERE table_name = ANY(%s)",
+                (list(tables),)
+            )
+            existing = frozenset(row[0] for row in result or ())
+            # Only a complete answer is kept, so tables created later are still found
+            if result is not None and existing.issuperset(tables):
+                self._tables_present[tables] = existing
+        return existing
     
-    def validate_database_setup(self) -> Dict[str, Any]:
+    def validate_database_setup(self) -> TestResult:
         """Validate that the practice database is set up correctly"""
         try:
             if not self.db.connect():
-                return {"status": "ERROR", "message": "Cannot connect to database. Run setup_db.py first."}
+                return TestResult("ERROR", "Cannot connect to database. Run setup_db.py first.")
             
             # Check if required tables exist
             required_tables = ['customers', 'products', 'categories', 'orders', 'order_items']
-            missing_tables = []
-            
-            for table in required_tables:
-                result = self.db.execute_query(
-                    "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = %s", 
-                    (table,)
-                )
-                if not result or result[0][0] == 0:
-                    missing_tables.append(table)
+            existing_tables = self._table_presence(tuple(required_tables))
+            missing_tables = [table for table in required_tables if table not in existing_tables]
             
             if missing_tables:
-                return {
-                    "status": "ERROR", 
-                    "message": f"Missing tables: {', '.join(missing_tables)}. Run setup_db.py"
-                }
+                return TestResult("ERROR", f"Missing tables: {', '.join(missing_tables)}. Run setup_db.py")
             
-            # Check if tables have data
-            data_counts = {}
-            for table in required_tables:
-                result = self.db.execute_query(f"SELECT COUNT(*) FROM {table}")
-                data_counts[table] = result[0][0] if result else 0
+            # Check if tables have data, counting every table in one round trip
+            result = self.db.execute_query(
+                "SELECT " + ", ".join(f"(SELECT COUNT(*) FROM {table})" for table in required_tables)
+            )
+            counts = result[0] if result else [0] * len(required_tables)
+            data_counts = dict(zip(required_tables, counts))
             
             if all(count > 0 for count in data_counts.values()):
-                return {
-                    "status": "PASS", 
-                    "message": "Database setup is complete and ready!",
-                    "data_counts": data_counts
-                }
+                return TestResult("PASS", "Database setup is complete and ready!", data_counts=data_counts)
             else:
-                return {
-                    "status": "WARNING", 
-                    "message": "Database exists but some tables are empty",
-                    "data_counts": data_counts
-                }
+                return TestResult("WARNING", "Database exists but some tables are empty", data_counts=data_counts)
                 
         except Exception as e:
-            return {"status": "ERROR", "message": f"Database validation error: {str(e)}"}
-        finally:
-            self.db.close()
+            return TestResult("ERROR", f"Database validation error: {str(e)}")
     
     def run_exercise_suite(self, exercise_path: str) -> None:
         """Run a complete test suite for a specific exercise directory"""
-        print(f"\n🚀 Running test suite for: {exercise_path}")
-        print("=" * 60)
+        # One connection serves the database check and every SQL exercise
+        try:
+            print(f"\n🚀 Running test suite for: {exercise_path}")
+            print("=" * 60)
         
-        # First validate database
-        db_result = self.validate_database_setup()
-        print(f"📊 Database Status: {db_result['status']} - {db_result['message']}")
+            # First validate database
+            db_result = self.validate_database_setup()
+            print(f"📊 Database Status: {db_result.status} - {db_result.message}")
         
-        if db_result['status'] == 'ERROR':
-            print("❌ Cannot proceed without database setup")
-            return
+            if db_result.status == 'ERROR':
+                print("❌ Cannot proceed without database setup")
+                return
         
-        # Test data structure exercises
-        ds_path = os.path.join(exercise_path, 'data_structures')
-        if os.path.exists(ds_path):
-            for file in os.listdir(ds_path):
-                if file.endswith('.py') and not file.startswith('__'):
-                    result = self.run_data_structure_tests(os.path.join(ds_path, file))
-                    status_emoji = "✅" if result['status'] == 'PASS' else "❌" if result['status'] == 'FAIL' else "⚠️"
-                    print(f"{status_emoji} {file}: {result['message']}")
+            # Test data structure exercises. Each file is independent and CPU-bound,
+            # so they run in worker processes and report as they finish.
+            ds_path = Path(exercise_path, 'data_structures')
+            if ds_path.is_dir():
+                ds_files = [str(path) for path in ds_path.glob('*.py') if not path.name.startswith('__')]
+                if ds_files:
+                    workers = min(len(ds_files), os.cpu_count() or 1)
+                    with ProcessPoolExecutor(max_workers=workers) as executor:
+                        futures = {executor.submit(_run_data_structure_file, path): path for path in ds_files}
+                        for future in as_completed(futures):
+                            result = future.result()
+                            status_emoji = "✅" if result.status == 'PASS' else "❌" if result.status == 'FAIL' else "⚠️"
+                            print(f"{status_emoji} {os.path.basename(futures[future])}: {result.message}")
         
-        # Test SQL exercises
-        sql_path = os.path.join(exercise_path, 'sql')
-        if os.path.exists(sql_path):
-            solution_path = os.path.join('database', 'solutions')
-            for file in os.listdir(sql_path):
-                if file.endswith('.sql'):
-                    solution_file = os.path.join(solution_path, file.replace('.sql', '_solutions.sql'))
-                    result = self.run_sql_tests(os.path.join(sql_path, file), solution_file)
-                    status_emoji = "✅" if result['status'] == 'PASS' else "❌" if result['status'] == 'FAIL' else "ℹ️"
-                    print(f"{status_emoji} {file}: {result['message']}")
+            # Test SQL exercises
+            sql_path = Path(exercise_path, 'sql')
+            if sql_path.is_dir():
+                solution_path = os.path.join('database', 'solutions')
+                for path in sql_path.glob('*.sql'):
+                    solution_file = os.path.join(solution_path, f"{path.stem}_solutions.sql")
+                    result = self.run_sql_tests(str(path), solution_file)
+                    status_emoji = "✅" if result.status == 'PASS' else "❌" if result.status == 'FAIL' else "ℹ️"
+                    print(f"{status_emoji} {path.name}: {result.message}")
+        finally:
+            self.db.close()
+
+def _run_data_structure_file(exercise_file: str) -> TestResult:
+    # Worker entry point: a fresh runner per process, since the parent's
+    # database connection can't be pickled (these tests never touch it).
+    # Tracebacks hold code objects, which don't pickle either, and the suite
+    # only reports status and message, so they stay in the worker.
+    return replace(TestRunner().run_data_structure_tests(exercise_file), traceback=None)
 
 def main():
     """Command line interface for test runner"""
@@ -168,6 +240,8 @@ def main():
         if file_path.endswith('.py'):
             result = runner.run_data_structure_tests(file_path)
             print(f"Result: {result}")
+            if result.traceback is not None:
+                print(runner.format_traceback(result))
         elif file_path.endswith('.sql'):
             result = runner.run_sql_tests(file_path)
             print(f"Result: {result}")
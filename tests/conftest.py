@@ -0,0 +1,11 @@
+"""
+Shared pytest setup for the exercise tests
+"""
+import os
+import sys
+
+# Make the exercise modules importable. This runs once, before pytest collects
+# any test module, so the test files can import them at module level.
+EXERCISES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'exercises', 'data_structures'))
+if EXERCISES_DIR not in sys.path:
+    sys.path.insert(0, EXERCISES_DIR)
@@ -3,12 +3,8 @@ Test cases for Arrays and Lists exercises
 Run with: pytest tests/test_arrays_and_lists.py --pdb
 """
 import pytest
-import sys
-import os
-
-# Add the exercises directory to the path so we can import the functions
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'exercises', 'data_structures'))
 
+# conftest.py puts the exercises directory on sys.path
 from arrays_and_lists import (
     find_missing_number,
     two_sum,
@@ -41,19 +37,22 @@ class TestTwoSum:
         assert result == [1,2], f"two_sum([3,2,4], 6): expected [1,2], got {result}"
 
 
+_EXPECTED_ANAGRAM_GROUPS = frozenset({
+    frozenset({"bat"}), frozenset({"nat","tan"}), frozenset({"ate","eat","tea"})
+})
+
+
 class TestGroupAnagrams:
     def test_basic_case(self):
         result = group_anagrams(["eat","tea","tan","ate","nat","bat"])
         # Convert to sets for comparison since order doesn't matter
-        result_sets = [set(group) for group in result]
-        expected_sets = [{"bat"}, {"nat","tan"}, {"ate","eat","tea"}]
+        result_sets = frozenset(frozenset(group) for group in result)
 
         # Check that we have the right number of groups
-        assert len(result_sets) == len(expected_sets), f"Expected {len(expected_sets)} groups, got {len(result_sets)}"
+        assert len(result) == len(_EXPECTED_ANAGRAM_GROUPS), f"Expected {len(_EXPECTED_ANAGRAM_GROUPS)} groups, got {len(result)}"
 
-        # Check that each expected group is in the result
-        for expected_group in expected_sets:
-            assert expected_group in result_sets, f"Expected group {expected_group} not found in result {result_sets}"
+        # Check that the groups match
+        assert result_sets == _EXPECTED_ANAGRAM_GROUPS, f"Expected groups {set(_EXPECTED_ANAGRAM_GROUPS)}, got {result}"
 
 
 class TestRemoveDuplicates:
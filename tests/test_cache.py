@@ -0,0 +1,230 @@
+"""
+Test cases for the query result cache (src/cache.py)
+Run with: pytest tests/test_cache.py
+"""
+import pytest
+
+import src.cache
+from src.cache import CachedDatabase, TTLCache
+from src.database import Database
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(src.cache, 'time', fake)
+    return fake
+
+
+@pytest.fixture
+def db(monkeypatch, clock):
+    # Stands in for the connection: records every statement and returns one row
+    calls = []
+
+    def execute_query(self, query, params=None):
+        calls.append((query, params))
+        return [(len(calls),)]
+
+    def execute_many(self, query, rows, *args, **kwargs):
+        calls.append((query, rows))
+        return len(rows)
+
+    monkeypatch.setattr(Database, 'execute_query', execute_query)
+    monkeypatch.setattr(Database, 'execute_many', execute_many)
+    cached_db = CachedDatabase(maxsize=16, ttl=60)
+    cached_db.calls = calls
+    return cached_db
+
+
+class TestTTLCache:
+    def test_get_before_expiry(self, clock):
+        cache = TTLCache(maxsize=4, ttl=10)
+        cache.set('a', 1)
+        clock.advance(9.9)
+        assert cache.get('a') == 1, "entry should still be live before its TTL"
+
+    def test_get_after_expiry(self, clock):
+        cache = TTLCache(maxsize=4, ttl=10)
+        cache.set('a', 1)
+        clock.advance(10)
+        assert cache.get('a') is None, "entry should expire once its TTL passes"
+        assert len(cache) == 0, "expired entry should be removed on read"
+        assert 'a' not in cache
+
+    def test_get_default(self, clock):
+        cache = TTLCache(maxsize=4, ttl=10)
+        assert cache.get('missing', 'default') == 'default'
+
+    def test_set_refreshes_ttl(self, clock):
+        cache = TTLCache(maxsize=4, ttl=10)
+        cache.set('a', 1)
+        clock.advance(8)
+        cache.set('a', 2)
+        clock.advance(8)
+        assert cache.get('a') == 2, "overwriting a key should restart its TTL"
+
+    def test_evicts_oldest_when_full(self, clock):
+        cache = TTLCache(maxsize=2, ttl=10)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.set('c', 3)
+        assert cache.keys() == ['b', 'c'], f"expected oldest entry evicted, got {cache.keys()}"
+
+    def test_overwrite_does_not_evict(self, clock):
+        cache = TTLCache(maxsize=2, ttl=10)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.set('a', 3)
+        assert cache.keys() == ['a', 'b'], f"overwriting a key should not evict, got {cache.keys()}"
+
+    def test_pop_and_clear(self, clock):
+        cache = TTLCache(maxsize=4, ttl=10)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        assert cache.pop('a') == 1
+        assert cache.pop('a', 'gone') == 'gone'
+        cache.clear()
+        assert len(cache) == 0
+
+
+class TestCachedDatabaseKeys:
+    def test_repeated_query_hits_cache(self, db):
+        first = db.execute_cached("SELECT * FROM orders WHERE order_id = %s", (1,))
+        second = db.execute_cached("SELECT * FROM orders WHERE order_id = %s", (1,))
+        assert first == second
+        assert len(db.calls) == 1, f"expected one database call, got {len(db.calls)}"
+        assert (db.cache_hits, db.cache_misses) == (1, 1)
+
+    def test_hits_return_independent_lists(self, db):
+        first = db.execute_cached("SELECT * FROM orders")
+        first.append(('mutated',))
+        second = db.execute_cached("SELECT * FROM orders")
+        second.clear()
+        third = db.execute_cached("SELECT * FROM orders")
+        assert third == [(1,)], f"caller mutations leaked into the cache: {third}"
+        assert len(db.calls) == 1
+
+    def test_different_params_miss(self, db):
+        db.execute_cached("SELECT * FROM orders WHERE order_id = %s", (1,))
+        db.execute_cached("SELECT * FROM orders WHERE order_id = %s", (2,))
+        assert len(db.calls) == 2, "different parameters should not share a cache entry"
+
+    def test_list_and_tuple_params_share_entry(self, db):
+        db.execute_cached("SELECT * FROM orders WHERE order_id = %s", [1])
+        db.execute_cached("SELECT * FROM orders WHERE order_id = %s", (1,))
+        assert len(db.calls) == 1
+
+    def test_mapping_params_keyed_on_values(self, db):
+        query = "SELECT * FROM orders WHERE order_id = %(id)s"
+        db.execute_cached(query, {'id': 1})
+        db.execute_cached(query, {'id': 2})
+        assert len(db.calls) == 2, "named parameters with different values should not share an entry"
+
+        db.execute_cached("SELECT %(a)s, %(b)s FROM orders", {'a': 1, 'b': 2})
+        db.execute_cached("SELECT %(a)s, %(b)s FROM orders", {'b': 2, 'a': 1})
+        assert len(db.calls) == 3, "key order of named parameters should not matter"
+
+    def test_unhashable_params_bypass_cache(self, db):
+        query = "SELECT * FROM orders WHERE order_id = ANY(%s)"
+        db.execute_cached(query, ([1, 2],))
+        db.execute_cached(query, ([1, 2],))
+        assert len(db.calls) == 2, "unhashable parameters should go straight to the database"
+
+    def test_expired_result_is_refetched(self, db, clock):
+        db.execute_cached("SELECT * FROM orders")
+        clock.advance(60)
+        db.execute_cached("SELECT * FROM orders")
+        assert len(db.calls) == 2, "a result past its TTL should be fetched again"
+
+
+class TestCachedDatabaseInvalidation:
+    def test_write_invalidates_reads_of_table(self, db):
+        db.execute_cached("SELECT * FROM orders")
+        db.execute_cached("SELECT * FROM products")
+        db.execute_query("UPDATE orders SET status = %s WHERE order_id = %s", ('shipped', 1))
+
+        db.execute_cached("SELECT * FROM orders")
+        db.execute_cached("SELECT * FROM products")
+        reads = [query for query, _ in db.calls if query.startswith('SELECT')]
+        assert reads.count("SELECT * FROM orders") == 2, "orders read should be refetched"
+        assert reads.count("SELECT * FROM products") == 1, "products read should stay cached"
+
+    def test_join_invalidated_by_either_table(self, db):
+        query = "SELECT * FROM orders o JOIN customers c ON o.customer_id = c.customer_id"
+        db.execute_cached(query)
+        db.execute_query("DELETE FROM customers WHERE customer_id = %s", (1,))
+        db.execute_cached(query)
+        assert sum(1 for q, _ in db.calls if q == query) == 2
+
+    def test_execute_many_invalidates(self, db):
+        db.execute_cached("SELECT * FROM order_items")
+        db.execute_many("INSERT INTO order_items (order_id, product_id) VALUES %s", [(1, 2)])
+        db.execute_cached("SELECT * FROM order_items")
+        assert sum(1 for q, _ in db.calls if q == "SELECT * FROM order_items") == 2
+
+    def test_write_inside_cte_invalidates(self, db):
+        db.execute_cached("SELECT * FROM orders")
+        db.execute_cached("SELECT * FROM order_archive")
+        db.execute_query(
+            "WITH moved AS (DELETE FROM orders WHERE order_id = %s RETURNING *) "
+            "INSERT INTO order_archive SELECT * FROM moved", (1,)
+        )
+        db.execute_cached("SELECT * FROM orders")
+        db.execute_cached("SELECT * FROM order_archive")
+        assert sum(1 for q, _ in db.calls if q == "SELECT * FROM orders") == 2
+        assert sum(1 for q, _ in db.calls if q == "SELECT * FROM order_archive") == 2
+
+    def test_upsert_invalidates_target(self, db):
+        db.execute_cached("SELECT * FROM products")
+        db.execute_query(
+            "INSERT INTO products (product_id, stock_quantity) VALUES (%s, %s) "
+            "ON CONFLICT (product_id) DO UPDATE SET stock_quantity = EXCLUDED.stock_quantity", (1, 5)
+        )
+        db.execute_cached("SELECT * FROM products")
+        assert sum(1 for q, _ in db.calls if q == "SELECT * FROM products") == 2
+
+    def test_read_racing_a_write_is_not_served(self, db, monkeypatch):
+        # The write lands (and invalidates) while the read is still running,
+        # so the rows it returns may predate the write
+        def execute_query(self, query, params=None):
+            db.calls.append((query, params))
+            if len(db.calls) == 1:
+                db.invalidate_table('orders')
+            return [(len(db.calls),)]
+
+        monkeypatch.setattr(Database, 'execute_query', execute_query)
+        db.execute_cached("SELECT * FROM orders")
+        result = db.execute_cached("SELECT * FROM orders")
+        assert result == [(2,)], f"rows read before the write were served from cache: {result}"
+        assert db.execute_cached("SELECT * FROM orders") == [(2,)], "the fresh read should be cached"
+        assert len(db.calls) == 2
+
+    def test_invalidate_table_is_case_insensitive(self, db):
+        db.execute_cached("SELECT * FROM Orders")
+        db.invalidate_table('ORDERS')
+        db.execute_cached("SELECT * FROM Orders")
+        assert len(db.calls) == 2
+
+    def test_clear_cache(self, db):
+        db.execute_cached("SELECT * FROM orders")
+        db.clear_cache()
+        db.execute_cached("SELECT * FROM orders")
+        assert len(db.calls) == 2
+
+    def test_table_versions_change_on_write(self, db):
+        before = db.table_versions(['orders', 'products'])
+        db.execute_query("UPDATE orders SET status = %s WHERE order_id = %s", ('shipped', 1))
+        after = db.table_versions(['Orders', 'products'])
+        assert after[0] != before[0], "a write should bump its table's version"
+        assert after[1] == before[1], "other tables' versions should be unchanged"
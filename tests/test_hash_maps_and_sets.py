@@ -3,12 +3,8 @@ Test cases for Hash Maps and Sets exercises
 Run with: pytest tests/test_hash_maps_and_sets.py --pdb
 """
 import pytest
-import sys
-import os
-
-# Add the exercises directory to the path so we can import the functions
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'exercises', 'data_structures'))
 
+# conftest.py puts the exercises directory on sys.path
 from hash_maps_and_sets import (
     first_uniq_char,
     is_anagram,